@@ -4,63 +4,92 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from PIL import Image, ImageTk
 import time
-import random
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from io import BytesIO
-import queue, json, sounddevice as sd, wave
-from vosk import Model, KaldiRecognizer
-from transformers import pipeline
-import torch
+import queue, sounddevice as sd
+import math
+import numpy as np
 import os
-import tempfile
-from moviepy.editor import VideoFileClip
+import getpass
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Local imports ---
-from models.posture_model import analyze_posture
-from models.speech_model import transcribe_audio
-from models.sentiment_model import analyze_sentiment
+from models import registry, perf
+from models.posture_model import draw_posture
+from models.speech_model import transcribe_media, WavWriter
+from models.sentiment_model import analyze_sentiment, analyze_sentiment_live_batch
+from models.video_model import analyze_video_frames, grab_frame, summarize_timeline
+from models.sentiment_worker import SentimentWorker
+from models.sentiment_cache import sentiment_cache
+from models.metrics_store import SessionMetrics
+from models.session import Session, compute_scores
+from models.archive import Archive
+from models.capture import CaptureWriter
 
 
 # ==========================================================
 #                   REAL-TIME SPEECH + SENTIMENT
 # ==========================================================
-VOSK_MODEL_PATH = "vosk-model-small-en-us-0.15"
-if not os.path.exists(VOSK_MODEL_PATH):
-    raise FileNotFoundError(f"Vosk model not found at {VOSK_MODEL_PATH}")
-
-vosk_model = Model(VOSK_MODEL_PATH)
-rec = KaldiRecognizer(vosk_model, 16000)
-
-sentiment_analyzer = pipeline(
-    "sentiment-analysis",
-    model="nlptown/bert-base-multilingual-uncased-sentiment",
-    device=0 if torch.cuda.is_available() else -1
-)
-
-audio_q = queue.Queue()
-
-
-def audio_callback(indata, frames, time_info, status):
-    if status:
-        print(status)
-    audio_q.put(bytes(indata))
-
-
-def analyze_sentiment_live(text):
-    """Color sentiment: red = neg, green = pos, white = neutral"""
-    if not text.strip():
-        return (255, 255, 255)
-    try:
-        result = sentiment_analyzer(text[:200])[0]
-        label = result["label"]
-        if "1" in label or "2" in label:
-            return (255, 80, 80)     # red
-        elif "4" in label or "5" in label:
-            return (80, 255, 80)     # green
-        else:
-            return (255, 255, 255)   # white
-    except Exception:
-        return (255, 255, 255)
+# Models are loaded lazily through the registry and warmed in the background once the
+# window is up; only the cheap existence check runs at import time.
+if not os.path.exists(registry.VOSK_MODEL_PATH):
+    raise FileNotFoundError(f"Vosk model not found at {registry.VOSK_MODEL_PATH}")
+
+# Live video: display at the camera rate, analyse every Nth frame so inference fits this budget
+FRAME_BUDGET = 1 / 30
+MAX_INFER_STRIDE = 15
+
+
+# ==========================================================
+#                    LIVE VIDEO DISPLAY
+# ==========================================================
+class VideoDisplay:
+    """
+    Paints BGR frames into a Tk label without per-frame allocations: the frame is resized
+    straight into a buffer sized to the widget, the overlay is drawn at display size, and
+    BGR->RGBA conversion writes into a second buffer that a PIL image shares (frombuffer),
+    which is pasted into one persistent PhotoImage. Buffers are only reallocated when the
+    widget is resized.
+    """
+
+    def __init__(self, label, container, padding=40):
+        self.label = label
+        self.container = container   # the widget whose size bounds the picture
+        self.padding = padding
+        self._size = None
+        self._bgr = self._rgba = self._image = self._photo = None
+
+    def _fit(self, frame):
+        h, w = frame.shape[:2]
+        box_w = self.container.winfo_width() - self.padding
+        box_h = self.container.winfo_height() - self.padding
+        if box_w <= 1 or box_h <= 1:   # not laid out yet
+            return w, h
+        scale = min(box_w / w, box_h / h, 1.0)
+        return max(2, int(w * scale)) & ~1, max(2, int(h * scale)) & ~1
+
+    def _allocate(self, size):
+        w, h = size
+        self._bgr = np.empty((h, w, 3), np.uint8)
+        self._rgba = np.empty((h, w, 4), np.uint8)
+        self._image = Image.frombuffer("RGBA", size, self._rgba, "raw", "RGBA", 0, 1)
+        self._photo = ImageTk.PhotoImage(self._image)
+        self.label.configure(image=self._photo)
+        self._size = size
+
+    def show(self, frame, draw=None):
+        """Display `frame`; `draw(bgr)` may paint an overlay onto the display-sized copy."""
+        size = self._fit(frame)
+        if size != self._size:
+            self._allocate(size)
+        # INTER_AREA only pays off for large reductions; at display scales it is ~5x slower
+        interp = cv2.INTER_AREA if size[0] * 2 <= frame.shape[1] else cv2.INTER_LINEAR
+        cv2.resize(frame, size, dst=self._bgr, interpolation=interp)
+        if draw:
+            draw(self._bgr)
+        cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        self._photo.paste(self._image)
 
 
 # ==========================================================
@@ -76,8 +105,18 @@ class AIInterviewCoach:
         self.running = False
         self.cap = cv2.VideoCapture(0)
         self.text_display = ""
-        self._audio_frames = []
+        self.session = None           # recogniser, graphs, queues and metrics of the current interview
+        self.session_dir = None       # archive directory of the current interview (audio is recorded there)
+        self.capture = None           # raw frame recorder for replay.py (COACH_CAPTURE=1)
+        self.archive = Archive()
+        self.candidate = os.environ.get("COACH_CANDIDATE") or getpass.getuser()
+        self._mic_thread = None
         self.border_color = "#00E5FF"
+        self._latest_frame = None        # last raw camera frame (BGR); the overlay is drawn at display size
+        self._latest_result = ("Not Detected", "Unknown", {}, [])
+        self.infer_stride = 1
+        self._video_threads = []
+        self.sentiment_worker = SentimentWorker(analyze_sentiment_live_batch, self._on_sentiment)
 
         # ---------------- UI ----------------
         self.title_label = tk.Label(self.root, text="AI INTERVIEW COACH", fg="#00E5FF", bg="#0E1116",
@@ -88,6 +127,7 @@ class AIInterviewCoach:
         self.video_frame.pack(pady=20, padx=20, fill="both", expand=True)
         self.video_label = tk.Label(self.video_frame, bg="#1B1F27")
         self.video_label.pack(padx=10, pady=10)
+        self.display = VideoDisplay(self.video_label, self.video_frame)
 
         self.subtitle_label = tk.Label(self.root, text="🎤 Speak to begin...", fg="white", bg="#0E1116",
                                        font=("Consolas", 18, "bold"), wraplength=900, justify="center")
@@ -128,6 +168,51 @@ class AIInterviewCoach:
 
         self.animate_title()
         self.pulse_border()
+        # warm the models only after the first frame has been drawn
+        self.root.after(200, registry.preload)
+
+        # ---------------- Performance overlay (F2) ----------------
+        self.perf_label = tk.Label(self.video_frame, text="", fg="#76FF03", bg="#000000",
+                                   font=("Consolas", 10), justify="left", anchor="nw")
+        self.perf_visible = False
+        self.root.bind("<F2>", self.toggle_perf_overlay)
+        export_path = os.environ.get("COACH_PERF_EXPORT")
+        if export_path:
+            perf.enable()
+            self.perf_exporter = perf.Exporter(export_path, float(os.environ.get("COACH_PERF_INTERVAL", 5))).start()
+        self.perf_always = perf.enabled  # COACH_PERF / COACH_PERF_EXPORT: keep instrumenting with the overlay hidden
+
+    # ----------------- Performance Overlay -----------------
+    def toggle_perf_overlay(self, event=None):
+        """F2: show/hide live FPS, queue depths and stage timings (instrumentation runs while shown)."""
+        self.perf_visible = not self.perf_visible
+        if self.perf_visible:
+            perf.enable()
+            self.perf_label.place(x=14, y=14)
+            self.update_perf_overlay()
+        else:
+            self.perf_label.place_forget()
+            if not self.perf_always:
+                perf.enable(False)
+
+    def update_perf_overlay(self):
+        if not self.perf_visible:
+            return
+        snap = perf.snapshot()
+        rates, gauges = snap["rates"], snap["gauges"]
+        lines = [
+            f"FPS  camera {rates.get('capture', 0):5.1f} | display {rates.get('display', 0):5.1f} | "
+            f"inference {rates.get('inference', 0):5.1f} (every {self.infer_stride})",
+            f"queues  audio {gauges.get('audio.queue_depth', 0)} | sentiment {self.sentiment_worker.queue_depth()}",
+        ]
+        rss = registry.rss_bytes()
+        if rss is not None:
+            perf.gauge("process.rss_mb", round(rss / 2**20, 1))
+            lines.append(f"memory  rss {rss / 2**20:7.1f} MB")
+        for name, st in sorted(snap["spans"].items()):
+            lines.append(f"{name:<22} p50 {st['p50_ms']:7.2f} ms  p95 {st['p95_ms']:7.2f} ms")
+        self.perf_label.config(text="\n".join(lines))
+        self.root.after(500, self.update_perf_overlay)
 
     # ----------------- Animations -----------------
     def animate_title(self):
@@ -158,74 +243,211 @@ class AIInterviewCoach:
         self.stop_btn.config(state="normal")
         self.feedback_label.config(text="🎥 Camera & mic active", fg="#76FF03")
         self.progress.start(15)
-        self._audio_frames = []
-        threading.Thread(target=self.listen_microphone, daemon=True).start()
+        self.session = Session()
+        self.session_dir = self.archive.session_dir(self.session.id, self.session.created)
+        if os.environ.get("COACH_CAPTURE", "") not in ("", "0"):
+            self.capture = CaptureWriter(self.session_dir, sample_rate=self.session.sample_rate)
+        self.sentiment_worker.start()
+        self._mic_thread = threading.Thread(target=self.listen_microphone, daemon=True)
+        self._mic_thread.start()
+        if not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(0)
+        self._video_threads = [threading.Thread(target=self.capture_loop, daemon=True),
+                               threading.Thread(target=self.inference_loop, daemon=True)]
+        for t in self._video_threads:
+            t.start()
         self.root.after(1000, self.run_video_feed)
 
     def listen_microphone(self):
-        with sd.RawInputStream(samplerate=16000, blocksize=8000, dtype="int16",
-                               channels=1, callback=audio_callback):
+        """Mic thread: stream audio to the session's audio.wav as it arrives and feed its recogniser."""
+        session = self.session
+        with WavWriter(os.path.join(self.session_dir, "audio.wav")) as wav, \
+                sd.RawInputStream(samplerate=session.sample_rate, blocksize=8000, dtype="int16",
+                                  channels=1, callback=session.audio_callback):
             while self.running:
                 try:
-                    data = audio_q.get(timeout=0.5)
-                    self._audio_frames.append(data)
-                    if rec.AcceptWaveform(data):
-                        result = json.loads(rec.Result())
-                        self.update_text(result.get("text", ""))
-                    else:
-                        partial = json.loads(rec.PartialResult())
-                        self.update_text(partial.get("partial", ""))
+                    data = session.audio_q.get(timeout=0.5)
                 except queue.Empty:
                     continue
+                self._accept_audio(session, wav, data)
+
+            # drain what the callback queued before the stream closed
+            while True:
+                try:
+                    self._accept_audio(session, wav, session.audio_q.get_nowait())
+                except queue.Empty:
+                    break
 
-        if self._audio_frames:
-            with wave.open("audio.wav", "wb") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(16000)
-                wf.writeframes(b"".join(self._audio_frames))
+        session.finish_audio()
 
-    def update_text(self, new_text):
+    def _accept_audio(self, session, wav, data):
+        wav.write(data)
+        text, final = session.accept_audio(data)
+        self.update_text(text, final=final)
+
+    def update_text(self, new_text, final=False):
+        """Show the subtitle right away; its sentiment colour arrives later from the worker."""
         if new_text:
             self.text_display = new_text
-            color = analyze_sentiment_live(new_text)
-            self.update_border_color(color)
-            hex_color = '#%02x%02x%02x' % color
-            self.subtitle_label.config(text=new_text, fg=hex_color)
+            self.subtitle_label.config(text=new_text)
+            self.sentiment_worker.submit(new_text, final=final)
+
+    def _on_sentiment(self, text, color, final):
+        # called on the sentiment worker thread -> hop back to Tk
+        self.root.after(0, self._apply_sentiment, text, color)
+
+    def _apply_sentiment(self, text, color):
+        self.update_border_color(color)
+        if text == self.text_display:
+            self.subtitle_label.config(fg='#%02x%02x%02x' % color)
+
+    def capture_loop(self):
+        """Camera thread: read every frame and hand every Nth to inference."""
+        session = self.session
+        capture = self.capture
+        n = 0
+        while self.running:
+            with perf.span("capture.read"):
+                ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            perf.tick("capture")
+            self._latest_frame = frame
+            if n % self.infer_stride == 0:
+                session.submit_frame(frame)
+            if capture:
+                capture.add(frame)
+            n += 1
+
+    def inference_loop(self):
+        """Inference thread: analyse the newest submitted frame and adapt the stride to the budget."""
+        session = self.session
+        avg = 0.0
+        while self.running:
+            try:
+                frame = session.infer_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            t0 = time.perf_counter()
+            self._latest_result = session.analyze_frame(frame)
+            perf.tick("inference")
+            dt = time.perf_counter() - t0
+            avg = dt if avg == 0.0 else 0.8 * avg + 0.2 * dt
+            self.infer_stride = max(1, min(MAX_INFER_STRIDE, math.ceil(avg / FRAME_BUDGET)))
 
     def run_video_feed(self):
+        """Tk tick: only paints the latest frame and result, never touches the camera or models."""
         if not self.running:
             return
-        ret, frame = self.cap.read()
-        if ret:
-            posture, eye_contact, annotated, _ = analyze_posture(frame)
+        frame = self._latest_frame
+        if frame is not None:
+            posture, eye_contact, _, marks = self._latest_result
             color = "#4CAF50" if posture in ("Good", "Slight slouch") else "#EF5350"
             self.feedback_label.config(text=f"🧍 Posture: {posture} | 👀 Eye Contact: {eye_contact}", fg=color)
 
-            rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            imgtk = ImageTk.PhotoImage(img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
+            with perf.span("display.paint"):
+                self.display.show(frame, lambda img: draw_posture(img, posture, eye_contact, marks))
+            perf.tick("display")
 
         self.root.after(33, self.run_video_feed)
 
     def stop_interview(self):
         self.running = False
+        self.sentiment_worker.stop()
+        print("💬 Sentiment worker:", self.sentiment_worker.stats())
+        print("🗃 Sentiment cache:", sentiment_cache.stats())
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         self.progress.stop()
         self.feedback_label.config(text="⚙️ Processing Summary...", fg="#FFEE58")
 
-        if self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                cv2.imwrite("snapshot.jpg", frame)
+        report = ReportWindow(self.root)
+        if self._latest_frame is not None:
+            report.set_snapshot(bgr_to_image(self._latest_frame))
+        state = {}
+        session = self.session
+        session_dir = self.session_dir
+        snapshot = self._latest_frame
+        capture, self.capture = self.capture, None
+
+        def finish_transcript():
+            # the live recogniser already transcribed the session; only FinalResult() was left to do
+            if self._mic_thread:
+                self._mic_thread.join(timeout=5)
+            for t in self._video_threads:
+                t.join(timeout=2)
             self.cap.release()
-
-        transcript = transcribe_audio("audio.wav") if os.path.exists("audio.wav") else self.text_display
-        sentiment = analyze_sentiment(transcript)
-        self.show_summary(transcript, sentiment)
+            if capture:
+                capture.close()
+            session.close()
+            print("🎯 Motion gate:", session.posture_stats())
+            state["transcript"] = session.transcript or self.text_display
+            state["segments"] = list(session.segments) or [state["transcript"]]
+            state["frames"] = session.metrics.to_array()
+            state["snapshot"] = snapshot
+            return state["transcript"]
+
+        self.finalise_report(report, [
+            ("Finishing transcript", finish_transcript, report.set_transcript),
+            *self._scoring_stages(report, state, session.metrics.summary),
+            self._archive_stage(report, state, session.id, "live", session.created, session_dir),
+        ])
+
+    def _archive_stage(self, report, state, session_id, kind, started, path=None):
+        """Report stage that stores the finished session and shows the candidate's recent runs."""
+        def archive():
+            self.archive.save(session_id, state["scores"], state["metrics"], state["sentiment"],
+                              segments=[s for s in state.get("segments", []) if s], frames=state.get("frames"),
+                              thumbnail=state.get("snapshot"), candidate=self.candidate, kind=kind,
+                              started=started, path=path)
+            return self.archive.history(self.candidate, limit=10)
+
+        return ("Archiving session", archive, report.set_history)
+
+    def _scoring_stages(self, report, state, metrics_fn):
+        """Report stages shared by live sessions and uploads: posture metrics, sentiment, scores, chart."""
+        def metrics():
+            state["metrics"] = metrics_fn()
+
+        def sentiment():
+            state["sentiment"] = analyze_sentiment(state.get("transcript", ""))
+
+        def scores():
+            state["scores"] = compute_scores(state["metrics"], state["sentiment"])
+            return state["scores"], state["metrics"]
+
+        return [
+            ("Scoring posture & eye contact", metrics, None),
+            ("Analysing speech sentiment", sentiment, None),
+            ("Computing scores", scores, lambda r: report.set_scores(*r)),
+            ("Rendering chart", lambda: render_chart(state["scores"]), report.set_chart),
+        ]
+
+    def finalise_report(self, report, stages):
+        """
+        Run report stages on a background thread. Each stage is (label, work, show):
+        `work()` runs off the Tk thread, and `show(result)` is posted back to Tk so the
+        report fills in section by section while the UI stays responsive.
+        """
+        def _run():
+            for i, (label, work, show) in enumerate(stages, 1):
+                self.root.after(0, report.set_status, f"⏳ {label}... ({i}/{len(stages)})")
+                t0 = time.perf_counter()
+                try:
+                    result = work()
+                except Exception as e:
+                    print(f"⚠️ Report stage '{label}' failed:", e)
+                    self.root.after(0, report.set_status, f"⚠️ {label} failed: {e}")
+                    self.root.after(0, self.feedback_label.config, {"text": "⚠️ Report incomplete", "fg": "#EF5350"})
+                    return
+                print(f"📝 {label}: {time.perf_counter() - t0:.2f}s")
+                if show:
+                    self.root.after(0, show, result)
+            self.root.after(0, report.set_status, "✅ Report ready")
+            self.root.after(0, self.feedback_label.config, {"text": "✅ Report ready", "fg": "#76FF03"})
+
+        threading.Thread(target=_run, daemon=True).start()
 
     # ==========================================================
     #               Uploaded Video Analysis
@@ -235,95 +457,179 @@ class AIInterviewCoach:
         if not path:
             return
         self.feedback_label.config(text="Analyzing uploaded video...", fg="#FFB74D")
-        clip = VideoFileClip(path)
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
-            clip.audio.write_audiofile(tmp_audio.name, verbose=False, logger=None)
-            text = transcribe_audio(tmp_audio.name)
-            sentiment = analyze_sentiment(text)
-
-        cap = cv2.VideoCapture(path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        mid_frame = total_frames // 2
-        frame = None
-        for i in range(total_frames):
-            ret, f = cap.read()
-            if not ret:
-                break
-            if i == mid_frame:
-                frame = f
-        cap.release()
+        report = ReportWindow(self.root)
+        state = {}
+        started = time.time()
+
+        def sample_frames():
+            # audio streams from ffmpeg into the recogniser on its own thread while the
+            # frame sampler works, so the two stages overlap instead of adding up
+            pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcribe")
+            state["transcript_job"] = pool.submit(transcribe_media, path)
+            pool.shutdown(wait=False)
+            state["timeline"] = analyze_video_frames(path)
+            timeline = state["timeline"]
+            frame = grab_frame(path, timeline[len(timeline) // 2]["frame"]) if timeline else None
+            state["snapshot"] = frame
+            return (bgr_to_image(frame) if frame is not None else None), timeline
+
+        def show_frames(result):
+            image, timeline = result
+            if image is not None:
+                report.set_snapshot(image)
+            report.set_timeline(timeline)
+
+        def transcribe():
+            state["transcript"] = state["transcript_job"].result()
+            state["segments"] = [state["transcript"]]
+            return state["transcript"]
+
+        def metrics():
+            store = SessionMetrics.from_timeline(state["timeline"])
+            state["frames"] = store.to_array()
+            return store.summary()
+
+        self.finalise_report(report, [
+            ("Sampling video frames & transcribing", sample_frames, show_frames),
+            ("Finishing transcript", transcribe, report.set_transcript),
+            *self._scoring_stages(report, state, metrics),
+            self._archive_stage(report, state, uuid.uuid4().hex[:12], "upload", started),
+        ])
 
-        if frame is not None:
-            cv2.imwrite("snapshot.jpg", frame)
+    def run(self):
+        self.root.mainloop()
 
-        self.show_summary(text, sentiment)
 
-    # ==========================================================
-    #                     Summary Window
-    # ==========================================================
-    def show_summary(self, transcript, sentiment):
-        summary = tk.Toplevel(self.root)
-        summary.title("📊 Interview Report")
-        summary.geometry("850x750")
-        summary.configure(bg="#111")
+# ==========================================================
+#                     Summary Window
+# ==========================================================
+def bgr_to_image(frame):
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
 
-        tk.Label(summary, text="Interview Performance Report", fg="#00E5FF", bg="#111",
-                 font=("Segoe UI Black", 24, "bold")).pack(pady=15)
 
-        if os.path.exists("snapshot.jpg"):
-            img = Image.open("snapshot.jpg")
-            img = img.resize((250, 200))
-            imgtk = ImageTk.PhotoImage(img)
-            tk.Label(summary, image=imgtk, bg="#111").pack()
-            summary.snapshot = imgtk
-
-        posture_score = random.randint(70, 95)
-        eye_score = random.randint(65, 90)
-        speech_score = int(float(sentiment['score']) * 100)
-        overall = (posture_score + eye_score + speech_score) // 3
-
-        if overall > 85:
-            comment = "🌟 Excellent confidence and clarity!"
-        elif overall > 65:
-            comment = "💪 Good performance, just refine consistency."
-        else:
-            comment = "⚡ Needs improvement in posture and tone."
+def render_chart(scores):
+    """Pie chart as an in-memory PIL image (Figure API, no pyplot state, safe off the Tk thread)."""
+    fig = Figure(figsize=(3.5, 3.5))
+    ax = fig.subplots()
+    ax.pie([scores["posture"], scores["eye"], scores["speech"]],
+           labels=["Posture", "Eye Contact", "Speech"], autopct="%1.1f%%",
+           colors=["#4CAF50", "#2196F3", "#FFC107"])
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    return Image.open(buf)
 
-        for label, score, color in [("🧍 Posture", posture_score, "#4CAF50"),
-                                    ("👀 Eye Contact", eye_score, "#2196F3"),
-                                    ("💬 Speech Sentiment", speech_score, "#FFC107")]:
-            tk.Label(summary, text=f"{label}: {score}%", fg=color, bg="#111", font=("Segoe UI", 16)).pack(pady=4)
 
-        tk.Label(summary, text=f"🎯 Overall Score: {overall}% | {comment}",
-                 fg="#FFD740", bg="#111", font=("Segoe UI Black", 18)).pack(pady=10)
+class ReportWindow:
+    """Report window that opens immediately with placeholders; sections are filled in as stages finish."""
+
+    def __init__(self, root):
+        self.win = tk.Toplevel(root)
+        self.win.title("📊 Interview Report")
+        self.win.geometry("850x750")
+        self.win.configure(bg="#111")
 
-        labels = ["Posture", "Eye Contact", "Speech"]
-        values = [posture_score, eye_score, speech_score]
-        colors = ["#4CAF50", "#2196F3", "#FFC107"]
-        fig, ax = plt.subplots(figsize=(3.5, 3.5))
-        ax.pie(values, labels=labels, autopct="%1.1f%%", colors=colors)
-        buf = BytesIO()
-        plt.savefig(buf, format="png")
-        plt.close(fig)
-        buf.seek(0)
-        chart = Image.open(buf)
-        chart_tk = ImageTk.PhotoImage(chart)
-        tk.Label(summary, image=chart_tk, bg="#111").pack()
-        summary.image = chart_tk
-
-        tk.Label(summary, text="🗣 Transcript:", fg="#00E5FF", bg="#111",
+        tk.Label(self.win, text="Interview Performance Report", fg="#00E5FF", bg="#111",
+                 font=("Segoe UI Black", 24, "bold")).pack(pady=15)
+        self.status = tk.Label(self.win, text="⏳ Preparing report...", fg="#FFEE58", bg="#111",
+                               font=("Segoe UI", 12))
+        self.status.pack()
+
+        # placeholders keep the section order fixed whatever finishes first
+        self.snapshot_frame = tk.Frame(self.win, bg="#111")
+        self.snapshot_frame.pack()
+        self.scores_frame = tk.Frame(self.win, bg="#111")
+        self.scores_frame.pack()
+        self.chart_frame = tk.Frame(self.win, bg="#111")
+        self.chart_frame.pack()
+        self.timeline_frame = tk.Frame(self.win, bg="#111")
+        self.timeline_frame.pack()
+        self.history_frame = tk.Frame(self.win, bg="#111")
+        self.history_frame.pack()
+
+        tk.Label(self.win, text="🗣 Transcript:", fg="#00E5FF", bg="#111",
                  font=("Segoe UI Black", 16)).pack(pady=(20, 5))
-        txt_box = tk.Text(summary, wrap="word", height=8, width=90,
-                          bg="#1B1F27", fg="white", font=("Consolas", 12))
-        txt_box.insert("1.0", transcript)
-        txt_box.config(state="disabled")
-        txt_box.pack(pady=5)
+        self.txt_box = tk.Text(self.win, wrap="word", height=8, width=90,
+                               bg="#1B1F27", fg="white", font=("Consolas", 12))
+        self.txt_box.insert("1.0", "…")
+        self.txt_box.config(state="disabled")
+        self.txt_box.pack(pady=5)
 
-        tk.Button(summary, text="Close Report", command=summary.destroy,
+        tk.Button(self.win, text="Close Report", command=self.win.destroy,
                   bg="#FF1744", fg="white", font=("Segoe UI", 14, "bold")).pack(pady=15)
 
-    def run(self):
-        self.root.mainloop()
+    def _alive(self):
+        return bool(self.win.winfo_exists())
+
+    def set_status(self, text):
+        if self._alive():
+            self.status.config(text=text)
+
+    def set_snapshot(self, image):
+        if not self._alive():
+            return
+        imgtk = ImageTk.PhotoImage(image.resize((250, 200)))
+        tk.Label(self.snapshot_frame, image=imgtk, bg="#111").pack()
+        self.win.snapshot = imgtk
+
+    def set_scores(self, scores, metrics):
+        if not self._alive():
+            return
+        for label, score, color in [("🧍 Posture", scores["posture"], "#4CAF50"),
+                                    ("👀 Eye Contact", scores["eye"], "#2196F3"),
+                                    ("💬 Speech Sentiment", scores["speech"], "#FFC107")]:
+            tk.Label(self.scores_frame, text=f"{label}: {score}%", fg=color, bg="#111",
+                     font=("Segoe UI", 16)).pack(pady=4)
+
+        if metrics["frames"]:
+            good = metrics["posture_time"].get("Good", 0.0)
+            dev = metrics["percentiles"].get("deviation")
+            detail = f"⏱ {metrics['seconds']:.0f}s analysed | upright {100 * good / max(metrics['seconds'], 1e-9):.0f}% of the time"
+            if dev:
+                detail += f" | torso tilt p50 {dev['p50']:.1f}° / p95 {dev['p95']:.1f}°"
+            tk.Label(self.scores_frame, text=detail, fg="#B0BEC5", bg="#111", font=("Segoe UI", 12)).pack(pady=2)
+
+        tk.Label(self.scores_frame, text=f"🎯 Overall Score: {scores['overall']}% | {scores['comment']}",
+                 fg="#FFD740", bg="#111", font=("Segoe UI Black", 18)).pack(pady=10)
+
+    def set_chart(self, image):
+        if not self._alive():
+            return
+        chart_tk = ImageTk.PhotoImage(image)
+        tk.Label(self.chart_frame, image=chart_tk, bg="#111").pack()
+        self.win.image = chart_tk
+
+    def set_timeline(self, timeline):
+        if not timeline or not self._alive():
+            return
+        tk.Label(self.timeline_frame, text="⏱ Posture / Eye Contact Timeline:", fg="#00E5FF", bg="#111",
+                 font=("Segoe UI Black", 16)).pack(pady=(20, 5))
+        tl_box = tk.Text(self.timeline_frame, wrap="none", height=5, width=90,
+                         bg="#1B1F27", fg="white", font=("Consolas", 11))
+        for start, end, posture, eye in summarize_timeline(timeline):
+            span = f"{int(start // 60):02d}:{int(start % 60):02d}–{int(end // 60):02d}:{int(end % 60):02d}"
+            tl_box.insert("end", f"{span}  🧍 {posture:<14} 👀 {eye}\n")
+        tl_box.config(state="disabled")
+        tl_box.pack(pady=5)
+
+    def set_history(self, rows):
+        """Recent runs of this candidate from the archive index (newest first), shown oldest -> newest."""
+        if len(rows) < 2 or not self._alive():
+            return
+        rows = rows[::-1]
+        lines = [f"📈 Last {len(rows)} runs"]
+        for label, key in (("🎯 Overall", "overall"), ("👀 Eye", "eye_score"), ("🧍 Posture", "posture_score")):
+            lines.append(f"{label}: " + " → ".join(str(r[key]) for r in rows if r[key] is not None))
+        tk.Label(self.history_frame, text="\n".join(lines), fg="#B0BEC5", bg="#111", font=("Segoe UI", 12),
+                 justify="left").pack(pady=(10, 0))
+
+    def set_transcript(self, transcript):
+        if not self._alive():
+            return
+        self.txt_box.config(state="normal")
+        self.txt_box.delete("1.0", "end")
+        self.txt_box.insert("1.0", transcript)
+        self.txt_box.config(state="disabled")
 
 
 if __name__ == "__main__":
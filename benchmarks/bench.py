@@ -0,0 +1,367 @@
+# benchmarks/bench.py
+# Offline benchmarks for the ASR, posture and sentiment hot paths (no camera or mic needed).
+#
+#   python -m benchmarks.bench --out bench.json
+#   python -m benchmarks.bench --out new.json --compare bench.json --tolerance 0.15
+#
+# With --compare the run exits with status 1 if any metric got worse than the baseline
+# by more than the tolerance (relative), if a baseline metric is missing from a section
+# that ran, or if any section reported an error, so it can gate a change in CI.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SAMPLE_WAVS = ["test.wav", "audio.wav", "temp.wav"]
+SAMPLE_IMAGE = "snapshot.jpg"
+SAMPLE_TEXTS = [
+    "I really enjoyed leading that project and the team delivered ahead of schedule.",
+    "Honestly the deadline was stressful and I was not happy with how it went.",
+    "My main strength is communication and I like explaining complex ideas simply.",
+    "I am not sure, I guess I would have handled the conflict differently.",
+    "We shipped the feature, measured the impact and iterated on customer feedback.",
+    "That was a difficult period and the results were disappointing for everyone.",
+    "I am excited about this role because it combines research and engineering.",
+    "Tell me more about the team structure and how success is measured here.",
+]
+
+SECTIONS = ["cold_start", "asr", "posture", "sentiment", "quantized"]
+
+# ---------------------- Helpers ----------------------
+
+def _path(name):
+    return os.path.join(ROOT, name)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+    except ImportError:
+        from models.registry import rss_bytes
+        rss = rss_bytes()
+        return round(rss / 2**20, 1) if rss else None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the models' progress prints while timing."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+        self.errors = {}
+
+    def add(self, name, value, unit, better):
+        """`better` is "lower" or "higher": which direction counts as an improvement."""
+        if value is not None:
+            self.metrics[name] = {"value": round(value, 4), "unit": unit, "better": better}
+            print(f"  {name:<45} {value:>10.3f} {unit}")
+
+# ---------------------- Sections ----------------------
+
+def bench_cold_start(res, args):
+    """Import + model load time in a fresh interpreter, as app.py startup would see it."""
+    code = (
+        "import json, time\n"
+        "t0 = time.perf_counter()\n"
+        "from models import registry\n"
+        "t_import = time.perf_counter() - t0\n"
+        "for name in ('vosk', 'pose', 'face_mesh', 'live_sentiment', 'sentiment'):\n"
+        "    try:\n"
+        "        registry.get(name)\n"
+        "    except Exception as e:\n"
+        "        print('ERR', name, e)\n"
+        "print(json.dumps({'import': t_import, 'total': time.perf_counter() - t0, **registry.stats()}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=900)
+    for line in out.stdout.splitlines():
+        if line.startswith("ERR "):
+            _, name, msg = line.split(" ", 2)
+            res.errors[f"cold_start.{name}"] = msg
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if not lines:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "no output")
+    data = json.loads(lines[-1])
+    res.add("cold_start.registry_import_s", data["import"], "s", "lower")
+    res.add("cold_start.all_models_s", data["total"], "s", "lower")
+    for name, s in data["models"].items():
+        res.add(f"cold_start.{name}_load_s", s["load_seconds"], "s", "lower")
+    res.add("cold_start.rss_after_load_mb", data.get("rss_mb"), "MB", "lower")
+
+    # importing app.py itself (no window is created) should stay cheap: models load later
+    code = "import time; t0 = time.perf_counter(); import app; print(time.perf_counter() - t0)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=300)
+    if out.returncode == 0:
+        res.add("cold_start.app_import_s", float(out.stdout.strip().splitlines()[-1]), "s", "lower")
+    else:
+        res.errors["cold_start.app_import"] = out.stderr.strip().splitlines()[-1]
+
+
+def bench_asr(res, args):
+    import soundfile as sf
+    from models.speech_model import transcribe_audio
+
+    for name in SAMPLE_WAVS:
+        path = _path(name)
+        if not os.path.exists(path):
+            continue
+        duration = sf.info(path).duration
+        key = os.path.splitext(name)[0]
+        for mode, parallel in (("serial", False), ("parallel", True)):
+            t0 = time.perf_counter()
+            with quiet():
+                transcribe_audio(path, parallel=parallel)
+            elapsed = time.perf_counter() - t0
+            res.add(f"asr.{key}.{mode}_rtf", elapsed / duration, "x realtime", "lower")
+
+
+def _synthetic_video(path, frames, size=(640, 480), fps=30):
+    """Write a short clip: the sample snapshot drifting sideways, so there is motion to track."""
+    import cv2
+    import numpy as np
+
+    base = cv2.imread(_path(SAMPLE_IMAGE))
+    base = cv2.resize(base, size) if base is not None else np.full((size[1], size[0], 3), 80, np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for i in range(frames):
+        shift = int(20 * np.sin(i / 15))
+        writer.write(np.roll(base, shift, axis=1))
+    writer.release()
+
+
+def bench_posture(res, args):
+    import cv2
+    from models.posture_model import (analyze_posture, PostureEstimator, create_pose,
+                                      create_face_mesh, measure_fps, gate_agreement)
+    from models.video_model import analyze_video_frames
+
+    image = cv2.imread(_path(SAMPLE_IMAGE))
+    if image is None:
+        raise RuntimeError(f"{SAMPLE_IMAGE} not found")
+    frames = [image] * args.frames
+    with quiet():
+        base_fps = measure_fps(analyze_posture, frames)
+        est = PostureEstimator(pose=create_pose(), face_mesh=create_face_mesh())
+        est_fps = measure_fps(lambda f: est.analyze(f, copy=False), [f.copy() for f in frames])
+        est.close()
+    res.add("posture.snapshot.analyze_posture_fps", base_fps, "fps", "higher")
+    res.add("posture.snapshot.estimator_fps", est_fps, "fps", "higher")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, "synthetic.mp4")
+        _synthetic_video(video, args.video_frames)
+        cap = cv2.VideoCapture(video)
+        clip = []
+        while True:
+            ret, f = cap.read()
+            if not ret:
+                break
+            clip.append(f)
+        cap.release()
+        if len(clip) > 1:
+            with quiet():
+                clip_fps = measure_fps(analyze_posture, clip)
+            res.add("posture.synthetic.analyze_posture_fps", clip_fps, "fps", "higher")
+            with quiet():
+                gate = gate_agreement(clip)
+            res.add("posture.synthetic.gate_skip_rate", gate["skip_rate"], "ratio", "higher")
+            res.add("posture.synthetic.gate_posture_agreement", gate["posture_agreement"], "ratio", "higher")
+            res.add("posture.synthetic.gate_eye_agreement", gate["eye_agreement"], "ratio", "higher")
+            res.add("posture.synthetic.gated_fps", gate["gated_fps"], "fps", "higher")
+            t0 = time.perf_counter()
+            with quiet():
+                analyze_video_frames(video, samples=24)
+            res.add("posture.synthetic.sample_24_frames_s", time.perf_counter() - t0, "s", "lower")
+
+    # motion gate vs full inference on real recordings (--clip, repeatable)
+    for i, path in enumerate(args.clip or []):
+        from models.posture_model import _read_frames
+        frames = _read_frames(path, args.video_frames)
+        if len(frames) < 2:
+            res.errors[f"posture.clip{i}"] = f"could not read {path}"
+            continue
+        with quiet():
+            gate = gate_agreement(frames)
+        for key in ("skip_rate", "posture_agreement", "eye_agreement"):
+            res.add(f"posture.clip{i}.gate_{key}", gate[key], "ratio", "higher")
+
+
+def _latencies(fn, texts, repeat):
+    from models.sentiment_cache import sentiment_cache
+    out = []
+    for _ in range(repeat):
+        for t in texts:
+            sentiment_cache.clear()  # measure inference, not cache hits
+            t0 = time.perf_counter()
+            fn(t)
+            out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_sentiment(res, args):
+    from models.sentiment_model import analyze_sentiment
+    from models.sentiment_cache import sentiment_cache
+
+    with quiet():
+        analyze_sentiment(SAMPLE_TEXTS[0])  # warm-up / load
+        lat = _latencies(analyze_sentiment, SAMPLE_TEXTS, args.repeat)
+    res.add("sentiment.report.p50_ms", percentile(lat, 50) * 1000, "ms", "lower")
+    res.add("sentiment.report.p95_ms", percentile(lat, 95) * 1000, "ms", "lower")
+
+    long_text = " ".join(SAMPLE_TEXTS * 40)
+    sentiment_cache.clear()
+    with quiet():
+        result = analyze_sentiment(long_text)
+    res.add("sentiment.report.windows_per_s", result.get("windows_per_sec"), "windows/s", "higher")
+
+    from models.sentiment_model import analyze_sentiment_live, analyze_sentiment_live_batch
+    with quiet():
+        analyze_sentiment_live(SAMPLE_TEXTS[0])
+        lat = _latencies(analyze_sentiment_live, SAMPLE_TEXTS, args.repeat)
+    res.add("sentiment.live.p50_ms", percentile(lat, 50) * 1000, "ms", "lower")
+    res.add("sentiment.live.p95_ms", percentile(lat, 95) * 1000, "ms", "lower")
+
+    batch = SAMPLE_TEXTS * 2
+    times = []
+    for _ in range(args.repeat):
+        sentiment_cache.clear()
+        t0 = time.perf_counter()
+        analyze_sentiment_live_batch(batch)
+        times.append(time.perf_counter() - t0)
+    res.add("sentiment.live.batch_texts_per_s", len(batch) / statistics.median(times), "texts/s", "higher")
+
+
+
+def bench_quantized(res, args):
+    """fp32 vs int8 for both sentiment models: label agreement, latency, batch throughput, size."""
+    from models import quantize, registry
+
+    print(f"  torch intra-op threads: {quantize.set_threads(args.threads)}")
+    texts = SAMPLE_TEXTS * 2
+    for key, name in (("live", registry.LIVE_SENTIMENT_MODEL), ("report", registry.REPORT_SENTIMENT_MODEL)):
+        labels = {}
+        for backend in ("fp32", "int8"):
+            with quiet():
+                pipe = registry.build_pipeline(name, backend)
+                pipe(SAMPLE_TEXTS[0], truncation=True)  # warm-up
+            lat = []
+            for _ in range(args.repeat):
+                for t in SAMPLE_TEXTS:
+                    t0 = time.perf_counter()
+                    pipe(t, truncation=True)
+                    lat.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            labels[backend] = [r["label"] for r in pipe(texts, batch_size=8, truncation=True)]
+            rate = len(texts) / (time.perf_counter() - t0)
+            res.add(f"quantized.{key}.{backend}.p50_ms", percentile(lat, 50) * 1000, "ms", "lower")
+            res.add(f"quantized.{key}.{backend}.p95_ms", percentile(lat, 95) * 1000, "ms", "lower")
+            res.add(f"quantized.{key}.{backend}.texts_per_s", rate, "texts/s", "higher")
+            del pipe
+        agree = sum(a == b for a, b in zip(labels["fp32"], labels["int8"])) / len(texts)
+        res.add(f"quantized.{key}.label_agreement", agree, "ratio", "higher")
+        path = quantize.cache_path(name)
+        if os.path.exists(path):
+            res.add(f"quantized.{key}.int8_cache_mb", os.path.getsize(path) / 2**20, "MB", "lower")
+
+# ---------------------- Comparison ----------------------
+
+def compare(current, baseline, tolerance):
+    """
+    Return a list of (name, baseline, current, change) for metrics worse than `tolerance`.
+    A baseline metric of a section that ran but produced no value (e.g. the section crashed)
+    counts as a regression with current and change None.
+    """
+    regressions = []
+    ran = set(current["meta"]["sections"]) | {"process"}
+    for name, base in baseline.get("metrics", {}).items():
+        if name.split(".")[0] in ran and name not in current["metrics"]:
+            print(f"❌ {name:<45} {base['value']:>10.3f} -> {'missing':>10}")
+            regressions.append((name, base["value"], None, None))
+    for name, m in current["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if not base or not base["value"]:
+            continue
+        change = (m["value"] - base["value"]) / abs(base["value"])
+        worse = change > tolerance if m["better"] == "lower" else change < -tolerance
+        flag = "❌" if worse else "  "
+        print(f"{flag} {name:<45} {base['value']:>10.3f} -> {m['value']:>10.3f} ({change:+.1%})")
+        if worse:
+            regressions.append((name, base["value"], m["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for AI Interview Coach")
+    parser.add_argument("--out", default="bench.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--only", help=f"comma-separated subset of {','.join(SECTIONS)}")
+    parser.add_argument("--frames", type=int, default=60, help="frames per posture FPS run")
+    parser.add_argument("--video-frames", type=int, default=150, help="length of the synthetic clip")
+    parser.add_argument("--clip", action="append", help="recorded clip for the motion-gate agreement check")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions for latency percentiles")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (quantized section)")
+    args = parser.parse_args(argv)
+
+    sections = args.only.split(",") if args.only else SECTIONS
+    res = Results()
+    for section in sections:
+        print(f"▶ {section}")
+        try:
+            globals()[f"bench_{section}"](res, args)
+        except Exception as e:
+            res.errors[section] = str(e)
+            print(f"  ⚠️ skipped: {e}")
+    res.add("process.peak_rss_mb", peak_rss_mb(), "MB", "lower")
+
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "sections": sections},
+        "metrics": res.metrics,
+        "errors": res.errors,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, err in res.errors.items():
+            print(f"❌ {name}: {err}")
+        if regressions or res.errors:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}, {len(res.errors)} error(s)")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# benchmarks/loadgen.py
+# Load generator for server.py: N simulated candidates each stream a WAV file and JPEG
+# frames in real time, then ask for the report.
+#
+#   python -m benchmarks.loadgen --clients 1,2,4,8 --seconds 20 [--url ws://127.0.0.1:8765]
+#
+# A session is "sustained" when the recogniser keeps up with real time (transcript lag
+# p95 below --max-lag) and posture results come back within --max-lag as well.
+# Reports sessions per core for the largest client count that every session sustained.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import struct
+import time
+
+import cv2
+import numpy as np
+import soundfile as sf
+from websockets.asyncio.client import connect
+
+from benchmarks.bench import ROOT, percentile
+
+CHUNK_SECONDS = 0.25
+
+
+def load_audio(path, rate=16000):
+    audio, sr = sf.read(path, dtype="int16", always_2d=True)
+    audio = audio[:, 0]
+    if sr != rate:
+        from models.speech_model import StreamingResampler
+        resampler = StreamingResampler(sr, rate)
+        audio = np.concatenate([resampler.process(audio), resampler.flush()])
+        audio = np.clip(audio, -32768, 32767).astype(np.int16)  # FIR overshoot must saturate, not wrap
+    return audio
+
+
+def load_jpeg(path, width=640):
+    frame = cv2.imread(path)
+    if frame is None:
+        frame = np.zeros((360, width, 3), np.uint8)
+    elif frame.shape[1] > width:
+        frame = cv2.resize(frame, (width, int(frame.shape[0] * width / frame.shape[1])))
+    return cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+async def client(url, audio, jpeg, seconds, fps, rate=16000):
+    """One simulated candidate. Returns per-session latency figures."""
+    out = {"audio_lag": [], "posture_latency": [], "events": 0, "report_s": None, "error": None}
+    chunk = int(rate * CHUNK_SECONDS)
+    total = int(seconds * rate)
+    try:
+        async with connect(url, max_size=2**24) as ws:
+            ready = json.loads(await ws.recv())
+            if ready.get("type") != "ready":
+                raise RuntimeError(ready.get("reason", ready))
+            t0 = time.perf_counter()
+            sent = {"audio": 0.0}
+
+            async def send():
+                pos, next_frame = 0, 0.0
+                while pos < total:
+                    now = time.perf_counter() - t0
+                    while next_frame <= now:
+                        await ws.send(b"V" + struct.pack("<d", time.perf_counter()) + jpeg)
+                        next_frame += 1.0 / fps
+                    block = audio[pos % len(audio):][:chunk]
+                    await ws.send(b"A" + block.tobytes())
+                    pos += len(block)
+                    sent["audio"] = pos / rate
+                    await asyncio.sleep(max(0.0, pos / rate - (time.perf_counter() - t0)))
+                sent["stop"] = time.perf_counter()
+                await ws.send(json.dumps({"type": "stop"}))
+
+            async def receive():
+                async for message in ws:
+                    event = json.loads(message)
+                    out["events"] += 1
+                    kind = event["type"]
+                    if kind in ("partial", "final"):
+                        out["audio_lag"].append(max(0.0, sent["audio"] - event["audio_seconds"]))
+                    elif kind == "posture":
+                        out["posture_latency"].append(time.perf_counter() - event["t"])
+                    elif kind == "report":
+                        out["report_s"] = time.perf_counter() - sent["stop"]
+                        out["stats"] = event.get("stats")
+                    elif kind == "error":
+                        out["error"] = event["reason"]
+
+            await asyncio.gather(send(), receive())
+    except Exception as e:
+        out["error"] = str(e) or type(e).__name__
+    return out
+
+
+async def run_level(url, n, audio, jpeg, seconds, fps):
+    return await asyncio.gather(*(client(url, audio, jpeg, seconds, fps) for _ in range(n)))
+
+
+def summarize(n, results, max_lag):
+    lags = [v for r in results for v in r["audio_lag"]]
+    lat = [v for r in results for v in r["posture_latency"]]
+    reports = [r["report_s"] for r in results if r["report_s"] is not None]
+    errors = [r["error"] for r in results if r["error"]]
+    sustained = sum(1 for r in results if not r["error"] and r["report_s"] is not None
+                    and (not r["audio_lag"] or percentile(r["audio_lag"], 95) <= max_lag)
+                    and (not r["posture_latency"] or percentile(r["posture_latency"], 95) <= max_lag))
+    return {
+        "clients": n,
+        "sustained": sustained,
+        "audio_lag_p95_s": round(percentile(lags, 95), 3) if lags else None,
+        "posture_latency_p50_ms": round(1000 * percentile(lat, 50), 1) if lat else None,
+        "posture_latency_p95_ms": round(1000 * percentile(lat, 95), 1) if lat else None,
+        "report_s_median": round(statistics.median(reports), 2) if reports else None,
+        "errors": errors[:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--url", default="ws://127.0.0.1:8765")
+    parser.add_argument("--clients", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=20.0, help="audio streamed per session")
+    parser.add_argument("--fps", type=float, default=10.0, help="frames sent per second per session")
+    parser.add_argument("--audio", default=os.path.join(ROOT, "test.wav"))
+    parser.add_argument("--image", default=os.path.join(ROOT, "snapshot.jpg"))
+    parser.add_argument("--max-lag", type=float, default=1.0, help="seconds")
+    parser.add_argument("--cores", type=int, default=os.cpu_count(), help="server cores, for sessions/core")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    audio, jpeg = load_audio(args.audio), load_jpeg(args.image)
+    levels, best = [], 0
+    for n in (int(x) for x in args.clients.split(",")):
+        results = asyncio.run(run_level(args.url, n, audio, jpeg, args.seconds, args.fps))
+        level = summarize(n, results, args.max_lag)
+        levels.append(level)
+        print(f"👥 {n:3d} clients: {level['sustained']}/{n} sustained | "
+              f"audio lag p95 {level['audio_lag_p95_s']}s | posture p95 {level['posture_latency_p95_ms']} ms | "
+              f"report {level['report_s_median']}s" + (f" | errors {level['errors']}" if level["errors"] else ""))
+        if level["sustained"] < n:
+            break
+        best = n
+
+    summary = {"levels": levels, "max_sustained": best, "cores": args.cores,
+               "sessions_per_core": round(best / max(args.cores, 1), 2)}
+    print(f"🏁 Sustained {best} concurrent sessions on {args.cores} cores "
+          f"({summary['sessions_per_core']} sessions/core)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
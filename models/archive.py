@@ -0,0 +1,170 @@
+# models/archive.py
+# Per-session archive. Each finished interview gets its own directory:
+#
+#   sessions/<started>-<id>/
+#       meta.json        scores, sentiment, metrics summary, candidate, timings
+#       transcript.json  recogniser segments
+#       metrics.npy      per-frame FRAME_DTYPE rows (np.load(..., mmap_mode="r") friendly)
+#       thumb.jpg        small JPEG snapshot
+#       audio.wav        live sessions only: the mic recording
+#
+# plus one sessions/index.sqlite holding a row of headline numbers per session, so history
+# and trend queries never open the per-session files.
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import cv2
+import numpy as np
+
+from models.registry import ROOT
+
+ARCHIVE_DIR = os.environ.get("COACH_ARCHIVE", os.path.join(ROOT, "sessions"))
+THUMB_WIDTH = 240
+
+# columns of the index; trend() accepts any of the numeric ones
+INDEX_COLUMNS = ("id", "path", "candidate", "kind", "started", "seconds", "frames",
+                 "posture_score", "eye_score", "speech_score", "overall", "sentiment")
+TREND_FIELDS = ("seconds", "frames", "posture_score", "eye_score", "speech_score", "overall")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    candidate TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    started REAL NOT NULL,
+    seconds REAL,
+    frames INTEGER,
+    posture_score INTEGER,
+    eye_score INTEGER,
+    speech_score INTEGER,
+    overall INTEGER,
+    sentiment TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_by_candidate ON sessions (candidate, started);
+CREATE INDEX IF NOT EXISTS sessions_by_time ON sessions (started);
+"""
+
+
+class Archive:
+    """Session directories under `root` and the sqlite index over them."""
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.sqlite")
+
+    def _connect(self):
+        os.makedirs(self.root, exist_ok=True)
+        db = sqlite3.connect(self.index_path, timeout=10)
+        db.row_factory = sqlite3.Row
+        db.executescript(_SCHEMA)
+        return db
+
+    # ---------------------- Writing ----------------------
+
+    def session_dir(self, session_id, started=None):
+        """Directory for a session (created if needed), e.g. to record audio into while it runs."""
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started or time.time()))
+        path = os.path.join(self.root, f"{stamp}-{session_id}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save(self, session_id, scores, metrics, sentiment, segments=(), frames=None,
+             thumbnail=None, candidate="", kind="live", started=None, path=None):
+        """
+        Store a finished session and index it. `metrics` is SessionMetrics.summary(),
+        `frames` the SessionMetrics.to_array() rows and `thumbnail` a BGR frame.
+        Returns the session directory.
+        """
+        started = started or time.time()
+        path = path or self.session_dir(session_id, started)
+        meta = {"id": session_id, "candidate": candidate, "kind": kind, "started": started,
+                "scores": scores, "metrics": metrics,
+                "sentiment": {k: sentiment.get(k) for k in ("label", "score")}}
+        _write_json(os.path.join(path, "meta.json"), meta)
+        _write_json(os.path.join(path, "transcript.json"), {"segments": list(segments)})
+        if frames is not None:
+            np.save(os.path.join(path, "metrics.npy"), np.ascontiguousarray(frames))
+        if thumbnail is not None:
+            save_thumbnail(os.path.join(path, "thumb.jpg"), thumbnail)
+        self._index(meta, path)
+        return path
+
+    def _index(self, meta, path):
+        scores, metrics = meta["scores"], meta["metrics"]
+        row = (meta["id"], os.path.relpath(path, self.root), meta["candidate"], meta["kind"], meta["started"],
+               metrics.get("seconds"), metrics.get("frames"), scores.get("posture"), scores.get("eye"),
+               scores.get("speech"), scores.get("overall"), meta["sentiment"].get("label"))
+        with closing(self._connect()) as db, db:
+            db.execute(f"INSERT OR REPLACE INTO sessions ({', '.join(INDEX_COLUMNS)}) "
+                       f"VALUES ({', '.join('?' * len(INDEX_COLUMNS))})", row)
+
+    def reindex(self):
+        """Rebuild the index from the meta.json files (e.g. after copying sessions in). Returns the count."""
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM sessions")
+        count = 0
+        for name in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, name, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    self._index(json.load(f), os.path.join(self.root, name))
+                count += 1
+        return count
+
+    # ---------------------- Queries ----------------------
+
+    def history(self, candidate=None, limit=20):
+        """Index rows (dicts) of the most recent sessions, newest first."""
+        sql, args = "SELECT * FROM sessions", []
+        if candidate is not None:
+            sql += " WHERE candidate = ?"
+            args.append(candidate)
+        sql += " ORDER BY started DESC LIMIT ?"
+        args.append(limit)
+        with closing(self._connect()) as db:
+            return [dict(r) for r in db.execute(sql, args)]
+
+    def trend(self, field, candidate=None, last=20):
+        """[(started, value), ...] for the last `last` sessions, oldest first, e.g. trend("eye_score")."""
+        if field not in TREND_FIELDS:
+            raise ValueError(f"Unknown trend field: {field}")
+        return [(r["started"], r[field]) for r in reversed(self.history(candidate, last))]
+
+    def load(self, session_id):
+        """meta.json of one session, with its transcript segments."""
+        path = self._path(session_id)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "transcript.json")) as f:
+            meta["segments"] = json.load(f)["segments"]
+        return meta
+
+    def load_frames(self, session_id, mmap=True):
+        """Per-frame metric rows; memory-mapped by default so long sessions open instantly."""
+        return np.load(os.path.join(self._path(session_id), "metrics.npy"), mmap_mode="r" if mmap else None)
+
+    def _path(self, session_id):
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT path FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown session: {session_id}")
+        return os.path.join(self.root, row["path"])
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def save_thumbnail(path, frame, width=THUMB_WIDTH, quality=70):
+    """Downscaled JPEG of a BGR frame (a few KB instead of a full-resolution snapshot)."""
+    h, w = frame.shape[:2]
+    if w > width:
+        frame = cv2.resize(frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+    cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
@@ -0,0 +1,189 @@
+# models/capture.py
+# Record-and-replay container for live sessions. A capture is a directory (normally the
+# session's archive directory) holding:
+#
+#   capture.json   shape, frame count, sample rate
+#   frames.raw     uint8 frames back to back, (n, height, width, 3) BGR
+#   frames_t.raw   float64 timestamps, seconds since capture start
+#   audio.wav      16 kHz mono int16 PCM from the mic thread (WavWriter, 44-byte header)
+#
+# Everything is fixed-width and uncompressed, so Capture opens it with np.memmap in O(1)
+# and the replay engine decodes nothing. The frame count is taken from the file sizes, so a
+# crashed session still replays up to its last complete frame.
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from models.speech_model import WavWriter
+
+VERSION = 1
+
+
+class CaptureWriter:
+    """
+    Appends camera frames to a capture directory. Frames are downscaled to `width` and
+    thinned to at most `fps` per second, which keeps a 640x360 capture at ~10 MB/s at 15 FPS.
+    Audio is not written here: record the mic with WavWriter(os.path.join(path, "audio.wav")).
+    """
+
+    def __init__(self, path, width=640, fps=15.0, sample_rate=16000):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.width = width
+        self.min_interval = 1.0 / fps if fps else 0.0
+        self.sample_rate = sample_rate
+        self.shape = None
+        self.count = 0
+        self._t0 = time.monotonic()
+        self._last_t = None
+        self._frames = open(os.path.join(path, "frames.raw"), "wb")
+        self._times = open(os.path.join(path, "frames_t.raw"), "wb")
+
+    def add(self, frame, t=None):
+        """Append one BGR frame (t: seconds since start, default now). Returns False if thinned out."""
+        t = time.monotonic() - self._t0 if t is None else t
+        if self._last_t is not None and t - self._last_t < self.min_interval - 1e-3:
+            return False
+        h, w = frame.shape[:2]
+        if w > self.width:
+            frame = cv2.resize(frame, (self.width, int(h * self.width / w)), interpolation=cv2.INTER_AREA)
+        if self.shape is None:
+            self.shape = frame.shape
+            self._write_meta()
+        elif frame.shape != self.shape:
+            frame = cv2.resize(frame, (self.shape[1], self.shape[0]), interpolation=cv2.INTER_AREA)
+        self._frames.write(np.ascontiguousarray(frame).data)
+        self._times.write(np.float64(t).tobytes())
+        self._last_t = t
+        self.count += 1
+        return True
+
+    def _write_meta(self):
+        h, w, c = self.shape if self.shape else (0, 0, 3)
+        meta = {"version": VERSION, "height": h, "width": w, "channels": c, "frames": self.count,
+                "sample_rate": self.sample_rate, "audio": "audio.wav", "created": time.time()}
+        with open(os.path.join(self.path, "capture.json"), "w") as f:
+            json.dump(meta, f, indent=1)
+
+    def close(self):
+        if not self._frames.closed:
+            self._frames.close()
+            self._times.close()
+            self._write_meta()
+
+
+class Capture:
+    """Read side: memory-mapped views over a capture directory."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "capture.json")) as f:
+            self.meta = json.load(f)
+        self.sample_rate = self.meta["sample_rate"]
+        shape = (self.meta["height"], self.meta["width"], self.meta["channels"])
+        frame_bytes = int(np.prod(shape))
+        frames_path = os.path.join(path, "frames.raw")
+        times_path = os.path.join(path, "frames_t.raw")
+        n = min(os.path.getsize(frames_path) // frame_bytes if frame_bytes else 0,
+                os.path.getsize(times_path) // 8)
+        self.frames = (np.memmap(frames_path, np.uint8, "r", shape=(n, *shape)) if n
+                       else np.empty((0, *shape), np.uint8))
+        self.times = np.memmap(times_path, np.float64, "r", shape=(n,)) if n else np.empty(0)
+        audio_path = os.path.join(path, self.meta.get("audio", "audio.wav"))
+        samples = 0
+        if os.path.exists(audio_path):
+            samples = (os.path.getsize(audio_path) - WavWriter.HEADER_BYTES) // 2
+        self.audio = (np.memmap(audio_path, np.int16, "r", offset=WavWriter.HEADER_BYTES, shape=(samples,))
+                      if samples > 0 else np.empty(0, np.int16))
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def seconds(self):
+        video = float(self.times[-1]) if len(self.times) else 0.0
+        return max(video, len(self.audio) / self.sample_rate)
+
+    def audio_chunks(self, samples=8000):
+        """int16 PCM bytes in `samples`-long chunks, straight from the mapped file."""
+        for i in range(0, len(self.audio), samples):
+            yield self.audio[i:i + samples].tobytes()
+
+
+def is_capture(path):
+    return os.path.exists(os.path.join(path, "capture.json"))
+
+# ---------------------- Replay ----------------------
+
+def replay(path, motion_gate=False, chunk=8000):
+    """
+    Re-run a capture through a fresh Session as fast as the CPU allows: audio into the
+    recogniser on one thread, frames into posture analysis on this one, then the report.
+    Returns the Session.report() dict plus the recogniser "segments", the per-frame metric
+    rows under "frames" (SessionMetrics.to_array(), for the archive) and replay timings
+    under "replay".
+    """
+    import threading
+    from models.session import Session
+
+    cap = Capture(path)
+    session = Session(session_id=os.path.basename(os.path.normpath(path)), sample_rate=cap.sample_rate,
+                      motion_gate=motion_gate)
+    t0 = time.perf_counter()
+
+    def _audio():
+        for pcm in cap.audio_chunks(chunk):
+            session.accept_audio(pcm)
+        session.finish_audio()
+
+    audio = threading.Thread(target=_audio, name="replay-audio", daemon=True)
+    audio.start()
+    try:
+        for frame, t in zip(cap.frames, cap.times):
+            session.analyze_frame(frame, float(t))
+        video_s = time.perf_counter() - t0
+        audio.join()
+        report = session.report()
+        report["segments"] = list(session.segments)
+        report["frames"] = session.metrics.to_array()
+    finally:
+        session.close()
+    wall = time.perf_counter() - t0
+    report["replay"] = {"path": path, "seconds": round(cap.seconds, 2), "frames": len(cap),
+                        "audio_seconds": round(len(cap.audio) / cap.sample_rate, 2),
+                        "video_s": round(video_s, 2), "wall_s": round(wall, 2),
+                        "speed_x": round(cap.seconds / wall, 2) if wall else None,
+                        "posture_gate": session.posture_stats()}
+    return report
+
+
+def _replay_job(args):
+    path, motion_gate = args
+    try:
+        return replay(path, motion_gate)
+    except Exception as e:
+        return {"id": os.path.basename(os.path.normpath(path)), "replay": {"path": path},
+                "error": f"{type(e).__name__}: {e}"}
+
+
+def _init_worker(torch_threads):
+    # N replays at once: keep each worker's torch from claiming every core
+    os.environ.setdefault("COACH_TORCH_THREADS", str(torch_threads))
+    from models import registry
+    registry.get("vosk")
+
+
+def replay_many(paths, workers=None, motion_gate=False):
+    """Replay several captures in parallel, one per worker process. Results follow `paths` order."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    jobs = [(p, motion_gate) for p in paths]
+    if workers <= 1:
+        return [_replay_job(job) for job in jobs]
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        return list(pool.map(_replay_job, jobs))
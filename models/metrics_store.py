@@ -0,0 +1,111 @@
+# models/metrics_store.py
+import threading
+import numpy as np
+
+POSTURE_LABELS = ("Not Detected", "Good", "Slight slouch", "Slouching")
+EYE_LABELS = ("Unknown", "Face not detected", "Face partly detected", "Maintained", "Looking Away")
+
+# score credit per posture label (Not Detected is excluded from the score)
+POSTURE_CREDIT = np.array([0.0, 1.0, 0.7, 0.3])
+
+# one row per analysed frame: 22 bytes, so 4 h at 30 FPS is ~9.5 MB
+FRAME_DTYPE = np.dtype([
+    ("t", "f8"),
+    ("deviation", "f4"),
+    ("eye_gap", "f4"),
+    ("nose_vs_center", "f4"),
+    ("posture", "i1"),
+    ("eye", "i1"),
+])
+
+
+class SessionMetrics:
+    """
+    Fixed-size ring buffer of per-frame posture / eye-contact metrics.
+
+    `append` is O(1) and never allocates; once `capacity` rows are stored the oldest are
+    overwritten, so memory stays at capacity * 22 bytes however long the session runs.
+    `summary` computes scores, percentiles and time-in-state with vectorized reductions.
+    """
+
+    def __init__(self, capacity=4 * 3600 * 30, max_gap=1.0):
+        self._buf = np.zeros(capacity, dtype=FRAME_DTYPE)
+        self.capacity = capacity
+        self.max_gap = max_gap          # longer pauses between samples don't count as time-in-state
+        self._count = 0                 # total rows ever appended
+        self._lock = threading.Lock()
+        self._posture_code = {label: i for i, label in enumerate(POSTURE_LABELS)}
+        self._eye_code = {label: i for i, label in enumerate(EYE_LABELS)}
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._buf.nbytes
+
+    def append(self, t, posture, eye_contact, info):
+        """Record one analysed frame (`info` is the dict returned by analyze_posture)."""
+        with self._lock:
+            row = self._buf[self._count % self.capacity]
+            row["t"] = t
+            row["deviation"] = info.get("deviation", np.nan)
+            row["eye_gap"] = info.get("eye_gap", np.nan)
+            row["nose_vs_center"] = info.get("nose_vs_center", np.nan)
+            row["posture"] = self._posture_code.get(posture, 0)
+            row["eye"] = self._eye_code.get(eye_contact, 0)
+            self._count += 1
+
+    def to_array(self):
+        """Chronologically ordered copy of the stored rows."""
+        with self._lock:
+            if self._count <= self.capacity:
+                return self._buf[:self._count].copy()
+            split = self._count % self.capacity
+            return np.concatenate([self._buf[split:], self._buf[:split]])
+
+    @classmethod
+    def from_timeline(cls, timeline):
+        """Build a store from video_model's sampled timeline."""
+        metrics = cls(capacity=max(1, len(timeline)), max_gap=float("inf"))
+        for e in timeline:
+            metrics.append(e["t"], e["posture"], e["eye_contact"], e["info"])
+        return metrics
+
+    def summary(self):
+        """Scores (0-100), torso / gaze percentiles and seconds spent in each state."""
+        a = self.to_array()
+        if len(a) == 0:
+            return {"frames": 0, "posture_score": 0, "eye_score": 0, "seconds": 0.0,
+                    "posture_time": {}, "eye_time": {}, "percentiles": {}}
+
+        # each sample holds its state until the next one (last sample: median spacing)
+        t = a["t"]
+        step = float(np.median(np.diff(t))) if len(t) > 1 else 0.0
+        dt = np.clip(np.diff(t, append=t[-1] + step), 0.0, self.max_gap)
+
+        posture_time = np.bincount(a["posture"], weights=dt, minlength=len(POSTURE_LABELS))
+        eye_time = np.bincount(a["eye"], weights=dt, minlength=len(EYE_LABELS))
+
+        detected = posture_time[1:].sum()
+        posture_score = 100 * (posture_time * POSTURE_CREDIT).sum() / detected if detected else 0.0
+        looked = eye_time[3] + eye_time[4]
+        eye_score = 100 * eye_time[3] / looked if looked else 0.0
+
+        percentiles = {}
+        for field in ("deviation", "eye_gap", "nose_vs_center"):
+            col = a[field][~np.isnan(a[field])]
+            if len(col):
+                p50, p90, p95 = np.percentile(col, [50, 90, 95])
+                percentiles[field] = {"p50": round(float(p50), 4), "p90": round(float(p90), 4),
+                                      "p95": round(float(p95), 4)}
+
+        return {
+            "frames": len(a),
+            "seconds": round(float(dt.sum()), 2),
+            "posture_score": int(round(posture_score)),
+            "eye_score": int(round(eye_score)),
+            "posture_time": {label: round(float(s), 2) for label, s in zip(POSTURE_LABELS, posture_time)},
+            "eye_time": {label: round(float(s), 2) for label, s in zip(EYE_LABELS, eye_time)},
+            "percentiles": percentiles,
+        }
@@ -0,0 +1,186 @@
+# models/perf.py
+# Lightweight per-stage timing. Wrap a stage in `with perf.span("name"):`; durations go into
+# rolling windows (last WINDOW samples) that report count / mean / p50 / p95 / max.
+# When disabled, span() returns a shared no-op context manager, so the cost is one global
+# lookup and a call. Enable with COACH_PERF=1 or perf.enable().
+import json
+import os
+import threading
+import time
+from collections import deque
+
+WINDOW = 512
+
+enabled = os.environ.get("COACH_PERF", "") not in ("", "0")
+
+_spans = {}
+_ticks = {}
+_gauges = {}
+_lock = threading.Lock()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _ticks.clear()
+        _gauges.clear()
+
+# ---------------------- Recording ----------------------
+
+def record(name, seconds):
+    """Add one duration sample to the rolling window for `name`."""
+    with _lock:
+        window = _spans.get(name)
+        if window is None:
+            window = _spans[name] = [deque(maxlen=WINDOW), 0]
+        window[0].append(seconds)
+        window[1] += 1
+
+
+def tick(name):
+    """Mark one event (e.g. a displayed frame); rate(name) turns these into events/second."""
+    if enabled:
+        with _lock:
+            ticks = _ticks.get(name)
+            if ticks is None:
+                ticks = _ticks[name] = deque(maxlen=WINDOW)
+            ticks.append(time.perf_counter())
+
+
+def gauge(name, value):
+    """Set a point-in-time value such as a queue depth."""
+    if enabled:
+        _gauges[name] = value
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+def span(name):
+    return _Span(name) if enabled else _NULL
+
+
+def timed(name, fn, *args, **kwargs):
+    """Call fn(*args, **kwargs) inside span(name); handy for work handed to a thread pool."""
+    with span(name):
+        return fn(*args, **kwargs)
+
+# ---------------------- Reading ----------------------
+
+def _percentile(sorted_values, q):
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def rate(name):
+    """Events per second over the rolling window of tick(name)."""
+    with _lock:
+        ticks = _ticks.get(name)
+        if not ticks or len(ticks) < 2 or ticks[-1] == ticks[0]:
+            return 0.0
+        # a stalled stream should read 0, not its old rate
+        if time.perf_counter() - ticks[-1] > 2.0:
+            return 0.0
+        return (len(ticks) - 1) / (ticks[-1] - ticks[0])
+
+
+def snapshot():
+    """Summary of all spans (ms), rates (per second) and gauges."""
+    with _lock:
+        spans = {name: (sorted(w[0]), w[1]) for name, w in _spans.items()}
+        gauges = dict(_gauges)
+        tick_names = list(_ticks)
+    out = {"spans": {}, "rates": {name: round(rate(name), 2) for name in tick_names}, "gauges": gauges}
+    for name, (values, count) in spans.items():
+        if values:
+            out["spans"][name] = {
+                "count": count,
+                "mean_ms": round(1000 * sum(values) / len(values), 3),
+                "p50_ms": round(1000 * _percentile(values, 0.50), 3),
+                "p95_ms": round(1000 * _percentile(values, 0.95), 3),
+                "max_ms": round(1000 * values[-1], 3),
+            }
+    return out
+
+
+def to_prometheus(snap=None):
+    """Prometheus text exposition format for a snapshot."""
+    snap = snap or snapshot()
+    lines = ["# TYPE coach_span_seconds summary"]
+    for name, s in snap["spans"].items():
+        for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+            lines.append(f'coach_span_seconds{{stage="{name}",quantile="{q}"}} {s[key] / 1000:.6f}')
+        lines.append(f'coach_span_seconds_count{{stage="{name}"}} {s["count"]}')
+    lines.append("# TYPE coach_rate_per_second gauge")
+    for name, value in snap["rates"].items():
+        lines.append(f'coach_rate_per_second{{name="{name}"}} {value}')
+    lines.append("# TYPE coach_gauge gauge")
+    for name, value in snap["gauges"].items():
+        lines.append(f'coach_gauge{{name="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    """Write a snapshot to `path`: Prometheus text for .prom / .txt, JSON otherwise."""
+    snap = snapshot()
+    text = to_prometheus(snap) if path.endswith((".prom", ".txt")) else json.dumps(snap, indent=2)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)  # readers never see a half-written file
+
+
+class Exporter:
+    """Daemon thread that calls export(path) every `interval` seconds."""
+
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="perf-exporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                export(self.path)
+            except OSError as e:
+                print("⚠️ perf export failed:", e)
@@ -3,13 +3,22 @@ import mediapipe as mp
 import cv2
 import math
 import numpy as np
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models import registry, perf
 
 mp_pose = mp.solutions.pose
 mp_face = mp.solutions.face_mesh
 
-pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-face_mesh = mp_face.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True,
-                             min_detection_confidence=0.5)
+def create_pose():
+    return mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+def create_face_mesh():
+    return mp_face.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True,
+                            min_detection_confidence=0.5)
 
 # helper: angle between three points (p1-p2-p3) in degrees
 def angle_between(p1, p2, p3):
@@ -19,98 +28,390 @@ def angle_between(p1, p2, p3):
     ang = np.degrees(np.arccos(np.clip(cosang, -1.0, 1.0)))
     return ang
 
+def _classify_pose(pose_res, info, marks):
+    """Posture label from Pose landmarks; fills info/marks. Landmarks are normalized, so any input scale works."""
+    # posture via torso angle: shoulders-hip line relative to vertical
+    if not (pose_res.pose_landmarks and len(pose_res.pose_landmarks.landmark) >= 25):
+        info['pose_landmarks'] = 0
+        return "Not Detected"
+
+    lm = pose_res.pose_landmarks.landmark
+    # choose left/right shoulders and hips
+    left_sh = lm[11]; right_sh = lm[12]
+    left_hip = lm[23]; right_hip = lm[24]
+
+    # compute torso angle using vector from mid-shoulder to mid-hip
+    mid_sh_x, mid_sh_y = (left_sh.x + right_sh.x)/2, (left_sh.y + right_sh.y)/2
+    mid_hp_x, mid_hp_y = (left_hip.x + right_hip.x)/2, (left_hip.y + right_hip.y)/2
+    dx = mid_hp_x - mid_sh_x
+    dy = mid_hp_y - mid_sh_y
+    torso_angle_deg = abs(math.degrees(math.atan2(dy, dx)))  # angle in normalized coords
+    # normalized coords: vertical corresponds to ~90 degrees; compute deviation from vertical
+    deviation = abs(90 - torso_angle_deg)
+    # Convert to a more intuitive metric: smaller deviation -> more vertical/upright
+    # Use thresholds tuned by experiment
+    if deviation < 8:
+        posture = "Good"
+    elif deviation < 18:
+        posture = "Slight slouch"
+    else:
+        posture = "Slouching"
+
+    # shoulders/hips and torso line
+    for p in (left_sh, right_sh, left_hip, right_hip):
+        marks.append(("circle", p.x, p.y, 4, (0,255,0)))
+    marks.append(("line", mid_sh_x, mid_sh_y, mid_hp_x, mid_hp_y, (255,0,0), 2))
+
+    info['torso_angle_deg'] = torso_angle_deg
+    info['deviation'] = deviation
+    return posture
+
+def _classify_face(face_res, info, marks, roi=None):
+    """
+    Eye-contact label from FaceMesh landmarks; fills info/marks.
+    `roi` = (x0, y0, x1, y1) in frame-normalized coords when FaceMesh ran on a crop,
+    so gaps are measured in the same units as a full-frame run.
+    """
+    # eye contact via face center and nose orientation fallback
+    if not face_res.multi_face_landmarks:
+        info['face_landmarks'] = 0
+        return "Face not detected"
+
+    fl = face_res.multi_face_landmarks[0].landmark
+    info['face_landmarks'] = len(fl)
+    # prefer nose tip or midpoint of eyes to compute face center
+    # Mediapipe iris landmarks 468/473 exist when refine_landmarks=True
+    if len(fl) <= 473:
+        return "Face partly detected"
+
+    x0, y0, x1, y1 = roi or (0.0, 0.0, 1.0, 1.0)
+    def to_frame(p):
+        return x0 + p.x * (x1 - x0), y0 + p.y * (y1 - y0)
+
+    (l_x, l_y), (r_x, r_y) = to_frame(fl[468]), to_frame(fl[473])
+    # horizontal gap between irises — if small, face looking forward
+    eye_gap = abs(l_x - r_x)
+    # compute eye midpoint x and nose tip x
+    nose_x, nose_y = to_frame(fl[1])  # landmark 1 is nose_tip (approx)
+    eye_mid_x = (l_x + r_x)/2
+    # compare nose x with eye midpoint, closer to center -> forward
+    nose_vs_center = abs(nose_x - eye_mid_x)
+    # thresholds tuned experimentally
+    if eye_gap < 0.08 and nose_vs_center < 0.03:
+        eye_contact = "Maintained"
+    else:
+        eye_contact = "Looking Away"
+
+    # some markers
+    marks.append(("circle", l_x, l_y, 2, (0,255,255)))
+    marks.append(("circle", r_x, r_y, 2, (0,255,255)))
+    marks.append(("circle", nose_x, nose_y, 2, (0,255,0)))
+
+    info['eye_gap'] = eye_gap
+    info['nose_vs_center'] = nose_vs_center
+    return eye_contact
+
+def estimate_posture(frame):
+    """
+    Run Pose + FaceMesh on a full-resolution BGR frame without drawing anything.
+    Returns: posture_label, eye_contact_label, info_dict, marks
+    marks are overlay primitives in normalized coords (see draw_posture), so the same
+    result can be painted onto later frames of the same stream.
+    """
+    with perf.span("posture.cvtColor"):
+        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # the registry graphs are shared process-wide; sessions that need their own use PostureEstimator
+    with registry.lock("pose"), perf.span("posture.pose"):
+        pose_res = registry.get("pose").process(img)
+    with registry.lock("face_mesh"), perf.span("posture.face_mesh"):
+        face_res = registry.get("face_mesh").process(img)
+
+    info = {}
+    marks = []
+    posture = _classify_pose(pose_res, info, marks)
+    eye_contact = _classify_face(face_res, info, marks)
+    return posture, eye_contact, info, marks
+
+def draw_posture(frame, posture, eye_contact, marks=()):
+    """Paint landmark marks and the label overlay onto `frame` in place; returns it."""
+    h, w = frame.shape[:2]
+    for m in marks:
+        if m[0] == "circle":
+            _, x, y, r, color = m
+            cv2.circle(frame, (int(x*w), int(y*h)), r, color, -1)
+        else:
+            _, x1, y1, x2, y2, color, thickness = m
+            cv2.line(frame, (int(x1*w), int(y1*h)), (int(x2*w), int(y2*h)), color, thickness)
+
+    # overlay labels
+    cv2.putText(frame, f"Posture: {posture}", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255,255,255), 2)
+    cv2.putText(frame, f"Eye: {eye_contact}", (10,60), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255,255,255), 2)
+    return frame
+
 def analyze_posture(frame, debug=False):
     """
     Returns: posture_label, eye_contact_label, annotated_frame, info_dict
     info_dict contains metrics used for decision (angles, gaps, landmark counts)
     """
-    img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    h, w = frame.shape[:2]
-    pose_res = pose.process(img)
-    face_res = face_mesh.process(img)
+    posture, eye_contact, info, marks = estimate_posture(frame)
+    with perf.span("posture.draw"):
+        annotated = draw_posture(frame.copy(), posture, eye_contact, marks)
+    return posture, eye_contact, annotated, info
 
-    posture = "Not Detected"
-    eye_contact = "Unknown"
-    annotated = frame.copy()
-    info = {}
+# ---------------------- Motion Gate ----------------------
 
-    # posture via torso angle: shoulders-hip line relative to vertical
-    if pose_res.pose_landmarks and len(pose_res.pose_landmarks.landmark) >= 25:
+class MotionGate:
+    """
+    Decides whether a frame changed enough since the last analysed one to be worth a full
+    inference. Frames are compared as small grayscale thumbnails (mean absolute difference
+    on a 0-255 scale); the reference only moves when a frame is let through, so slow drift
+    still adds up past `threshold`. At most `max_reuse` frames in a row are skipped.
+    """
+
+    def __init__(self, threshold=2.5, size=(64, 48), max_reuse=10):
+        self.threshold = threshold
+        self.size = size
+        self.max_reuse = max_reuse
+        self._ref = None
+        self._reused = 0
+        self.frames = 0
+        self.skipped = 0
+        self.last_diff = 0.0
+
+    def check(self, frame):
+        """True if `frame` needs a full inference (it then becomes the new reference)."""
+        self.frames += 1
+        with perf.span("posture.gate"):
+            step = max(1, frame.shape[1] // (4 * self.size[0]))  # subsample first: INTER_AREA on 1080p is slow
+            thumb = cv2.resize(frame[::step, ::step], self.size, interpolation=cv2.INTER_AREA)
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+            if self._ref is not None and self._reused < self.max_reuse:
+                self.last_diff = float(cv2.absdiff(thumb, self._ref).mean())
+                if self.last_diff < self.threshold:
+                    self._reused += 1
+                    self.skipped += 1
+                    return False
+        self._ref = thumb
+        self._reused = 0
+        return True
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped,
+                "skip_rate": round(self.skipped / self.frames, 3) if self.frames else 0.0}
+
+# ---------------------- Optimized Estimator ----------------------
+
+# Pose head landmarks (nose, eyes, ears, mouth) used to place the face crop
+HEAD_LANDMARKS = range(11)
+# the crop is only re-placed once the head centre moves this share of its side, or its size changes by 25%
+ROI_SLACK = 0.15
+
+class PostureEstimator:
+    """
+    Faster drop-in for estimate_posture on video streams:
+    - Pose runs on a copy downscaled to `infer_width` (landmarks are normalized, so labels
+      and overlays still map onto the full-resolution frame)
+    - FaceMesh runs on a square full-resolution crop around the head, placed from Pose head
+      landmarks. The crop stays put while the head stays inside it, so FaceMesh keeps
+      tracking in a fixed geometry; it is only re-placed when the head drifts or the face
+      is lost. Crops and whole frames go through separate FaceMesh graphs, so neither
+      graph's tracking state ever refers to the other's input
+    - the two graphs run concurrently (when there is more than one core), and BGR->RGB
+      only touches the small inputs
+    With private=True the estimator builds (and closes) its own graphs instead of using the
+    registry's, so several sessions can track different people at the same time. With a
+    MotionGate, frames that barely differ from the last analysed one reuse its result.
+    """
+
+    def __init__(self, pose=None, face_mesh=None, infer_width=320, face_size=192, roi_scale=2.2,
+                 concurrent=None, private=False, gate=None, crop_mesh=None):
+        self.gate = gate
+        self._last = None
+        self._owned = []
+        if private and pose is None:
+            pose = create_pose()
+            self._owned.append(pose)
+        if private and face_mesh is None:
+            face_mesh = create_face_mesh()
+            self._owned.append(face_mesh)
+        self.pose = pose or registry.get("pose")
+        self.face_mesh = face_mesh or registry.get("face_mesh")
+        self.crop_mesh = crop_mesh    # FaceMesh for head crops, built on first use
+        self.infer_width = infer_width
+        self.face_size = face_size
+        self.roi_scale = roi_scale
+        self._roi = None
+        if concurrent is None:
+            concurrent = (os.cpu_count() or 1) > 1
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-mesh") if concurrent else None
+
+    def _face_input(self, frame):
+        """
+        RGB head crop for FaceMesh and the frame-normalized box it covers, or (None, None).
+        A box that runs off the frame is padded, not stretched, so the crop stays square and
+        the eye / iris geometry keeps its proportions.
+        """
+        h, w = frame.shape[:2]
+        x0, y0, x1, _ = self._roi
+        side = max(1, int(round((x1 - x0) * w)))
+        px0, py0 = int(round(x0 * w)), int(round(y0 * h))
+        px1, py1 = px0 + side, py0 + side
+        crop = frame[max(0, py0):min(h, py1), max(0, px0):min(w, px1)]
+        if crop.size == 0:
+            return None, None
+        if crop.shape[:2] != (side, side):
+            crop = cv2.copyMakeBorder(crop, max(0, -py0), max(0, py1 - h), max(0, -px0), max(0, px1 - w),
+                                      cv2.BORDER_CONSTANT)
+        crop = cv2.resize(crop, (self.face_size, self.face_size),
+                          interpolation=cv2.INTER_AREA if side > self.face_size else cv2.INTER_LINEAR)
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), (px0 / w, py0 / h, px1 / w, py1 / h)
+
+    def _face(self, crop, roi, full_img):
+        """FaceMesh result and the box it covers: the head crop first, the whole small frame if that fails."""
+        if crop is not None:
+            if self.crop_mesh is None:
+                self.crop_mesh = create_face_mesh()
+                self._owned.append(self.crop_mesh)
+            face_res = perf.timed("posture.face_mesh", self.crop_mesh.process, crop)
+            if face_res.multi_face_landmarks:
+                return face_res, roi
+        return perf.timed("posture.face_mesh", self.face_mesh.process, full_img), None
+
+    def _update_roi(self, pose_res, shape, keep):
+        """
+        Square head box (normalized, may extend past the frame) for the next frame, from this
+        frame's Pose landmarks. With `keep` (the crop found the face) the current box is kept
+        unless the head has drifted out of its slack.
+        """
+        old, self._roi = self._roi, None
+        if not pose_res.pose_landmarks:
+            return
         lm = pose_res.pose_landmarks.landmark
-        # choose left/right shoulders and hips
-        left_sh = lm[11]; right_sh = lm[12]
-        left_hip = lm[23]; right_hip = lm[24]
-
-        # midpoints
-        mid_sh = mp.math_helpers._NormalizedLandmark( # fallback if not available; but easier to compute manually
-            x=(left_sh.x + right_sh.x)/2, y=(left_sh.y + right_sh.y)/2
-        ) if False else None
-
-        # compute torso angle using vector from mid-shoulder to mid-hip
-        mid_sh_x, mid_sh_y = (left_sh.x + right_sh.x)/2, (left_sh.y + right_sh.y)/2
-        mid_hp_x, mid_hp_y = (left_hip.x + right_hip.x)/2, (left_hip.y + right_hip.y)/2
-        dx = mid_hp_x - mid_sh_x
-        dy = mid_hp_y - mid_sh_y
-        torso_angle_deg = abs(math.degrees(math.atan2(dy, dx)))  # angle in normalized coords
-        # normalized coords: vertical corresponds to ~90 degrees; compute deviation from vertical
-        deviation = abs(90 - torso_angle_deg)
-        # Convert to a more intuitive metric: smaller deviation -> more vertical/upright
-        # Use thresholds tuned by experiment
-        if deviation < 8:
-            posture = "Good"
-        elif deviation < 18:
-            posture = "Slight slouch"
+        pts = [lm[i] for i in HEAD_LANDMARKS if lm[i].visibility > 0.5]
+        if len(pts) < 3:
+            return
+        h, w = shape[:2]
+        xs = [p.x * w for p in pts]; ys = [p.y * h for p in pts]
+        cx, cy = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+        half = max(max(xs) - min(xs), max(ys) - min(ys), 24) * self.roi_scale / 2
+        if keep and old is not None:
+            old_half = (old[2] - old[0]) * w / 2
+            old_cx, old_cy = (old[0] + old[2]) * w / 2, (old[1] + old[3]) * h / 2
+            if (max(abs(cx - old_cx), abs(cy - old_cy)) < ROI_SLACK * 2 * old_half
+                    and 0.8 < half / old_half < 1.25):
+                self._roi = old
+                return
+        if cx + half > 0 and cx - half < w and cy + half > 0 and cy - half < h:
+            self._roi = ((cx - half) / w, (cy - half) / h, (cx + half) / w, (cy + half) / h)
+
+    def estimate(self, frame):
+        """Same contract as estimate_posture: (posture, eye_contact, info, marks)."""
+        if self.gate is not None and not self.gate.check(frame) and self._last is not None:
+            posture, eye_contact, info, marks = self._last
+            return posture, eye_contact, dict(info), marks
+        h, w = frame.shape[:2]
+        with perf.span("posture.cvtColor"):
+            if w > self.infer_width:
+                small = cv2.resize(frame, (self.infer_width, int(h * self.infer_width / w)),
+                                   interpolation=cv2.INTER_LINEAR)
+            else:
+                small = frame
+            pose_img = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            crop, roi = self._face_input(frame) if self._roi is not None else (None, None)
+
+        if self._pool:
+            face_job = self._pool.submit(self._face, crop, roi, pose_img)
+            pose_res = perf.timed("posture.pose", self.pose.process, pose_img)
+            face_res, roi = face_job.result()
         else:
-            posture = "Slouching"
+            pose_res = perf.timed("posture.pose", self.pose.process, pose_img)
+            face_res, roi = self._face(crop, roi, pose_img)
 
-        # draw shoulders/hips and line
-        cv2.circle(annotated, (int(left_sh.x*w), int(left_sh.y*h)), 4, (0,255,0), -1)
-        cv2.circle(annotated, (int(right_sh.x*w), int(right_sh.y*h)), 4, (0,255,0), -1)
-        cv2.circle(annotated, (int(left_hip.x*w), int(left_hip.y*h)), 4, (0,255,0), -1)
-        cv2.circle(annotated, (int(right_hip.x*w), int(right_hip.y*h)), 4, (0,255,0), -1)
-        cv2.line(annotated, (int(mid_sh_x*w), int(mid_sh_y*h)), (int(mid_hp_x*w), int(mid_hp_y*h)), (255,0,0), 2)
+        info = {}
+        marks = []
+        posture = _classify_pose(pose_res, info, marks)
+        eye_contact = _classify_face(face_res, info, marks, roi)
+        self._update_roi(pose_res, frame.shape, keep=roi is not None)
+        self._last = (posture, eye_contact, info, marks)
+        return posture, eye_contact, info, marks
 
-        info['torso_angle_deg'] = torso_angle_deg
-        info['deviation'] = deviation
-    else:
-        info['pose_landmarks'] = 0
+    def analyze(self, frame, copy=True):
+        """analyze_posture contract; with copy=False the overlay is drawn into `frame` itself."""
+        posture, eye_contact, info, marks = self.estimate(frame)
+        with perf.span("posture.draw"):
+            annotated = draw_posture(frame.copy() if copy else frame, posture, eye_contact, marks)
+        return posture, eye_contact, annotated, info
 
-    # eye contact via face center and nose orientation fallback
-    if face_res.multi_face_landmarks:
-        fl = face_res.multi_face_landmarks[0].landmark
-        info['face_landmarks'] = len(fl)
-        # prefer nose tip or midpoint of eyes to compute face center
-        # Mediapipe iris landmarks 468/473 exist when refine_landmarks=True
-        if len(fl) > 473:
-            l_eye = fl[468]; r_eye = fl[473]
-            # horizontal gap between irises — if small, face looking forward
-            eye_gap = abs(l_eye.x - r_eye.x)
-            # compute eye midpoint x and nose tip x
-            nose_tip = fl[1]  # landmark 1 is nose_tip (approx)
-            eye_mid_x = (l_eye.x + r_eye.x)/2
-            # compare nose x with eye midpoint, closer to center -> forward
-            nose_vs_center = abs(nose_tip.x - eye_mid_x)
-            # thresholds tuned experimentally
-            if eye_gap < 0.08 and nose_vs_center < 0.03:
-                eye_contact = "Maintained"
-            else:
-                eye_contact = "Looking Away"
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=True)
+        for graph in self._owned:
+            graph.close()
+        self._owned = []
 
-            # draw some markers
-            cv2.circle(annotated, (int(l_eye.x*w), int(l_eye.y*h)), 2, (0,255,255), -1)
-            cv2.circle(annotated, (int(r_eye.x*w), int(r_eye.y*h)), 2, (0,255,255), -1)
-            cv2.circle(annotated, (int(nose_tip.x*w), int(nose_tip.y*h)), 2, (0,255,0), -1)
+# ---------------------- FPS Comparison ----------------------
 
-            info['eye_gap'] = eye_gap
-            info['nose_vs_center'] = nose_vs_center
-        else:
-            eye_contact = "Face partly detected"
-    else:
-        info['face_landmarks'] = 0
-        eye_contact = "Face not detected"
+def _read_frames(source, limit):
+    if source.lower().endswith((".jpg", ".jpeg", ".png")):
+        img = cv2.imread(source)
+        return [img] * limit if img is not None else []
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < limit:
+        ret, f = cap.read()
+        if not ret:
+            break
+        frames.append(f)
+    cap.release()
+    return frames
 
-    # overlay labels
-    cv2.putText(annotated, f"Posture: {posture}", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255,255,255), 2)
-    cv2.putText(annotated, f"Eye: {eye_contact}", (10,60), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255,255,255), 2)
+def measure_fps(analyze, frames):
+    """Frames per second of `analyze(frame)` over `frames` (first frame excluded as warm-up)."""
+    analyze(frames[0])
+    t0 = time.perf_counter()
+    for f in frames[1:]:
+        analyze(f)
+    return (len(frames) - 1) / (time.perf_counter() - t0)
 
-    return posture, eye_contact, annotated, info
+def gate_agreement(frames, **gate_kwargs):
+    """
+    Run a full and a motion-gated estimator over the same frames and compare their labels.
+    Returns the gate's skip rate, the share of frames where posture / eye contact agree
+    with full inference, and both estimators' FPS.
+    """
+    full = PostureEstimator(private=True)
+    gate = MotionGate(**gate_kwargs)
+    gated = PostureEstimator(private=True, gate=gate)
+    try:
+        t0 = time.perf_counter()
+        ref = [full.estimate(f)[:2] for f in frames]
+        full_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = [gated.estimate(f)[:2] for f in frames]
+        gated_s = time.perf_counter() - t0
+    finally:
+        full.close()
+        gated.close()
+    n = len(frames)
+    return {
+        **gate.stats(),
+        "posture_agreement": round(sum(a[0] == b[0] for a, b in zip(ref, got)) / n, 3),
+        "eye_agreement": round(sum(a[1] == b[1] for a, b in zip(ref, got)) / n, 3),
+        "full_fps": round(n / full_s, 1),
+        "gated_fps": round(n / gated_s, 1),
+    }
+
+if __name__ == "__main__":
+    # python -m models.posture_model [video|image|camera_index] [frames]
+    source = sys.argv[1] if len(sys.argv) > 1 else "snapshot.jpg"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    frames = _read_frames(source, count)
+    if len(frames) < 2:
+        sys.exit(f"Could not read frames from {source}")
+    print(f"🎞 {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]} from {source}")
+    base = measure_fps(analyze_posture, frames)
+    print(f"analyze_posture:            {base:6.1f} FPS")
+    est = PostureEstimator(pose=create_pose(), face_mesh=create_face_mesh())
+    fast = measure_fps(lambda f: est.analyze(f, copy=False), [f.copy() for f in frames])
+    print(f"PostureEstimator.analyze:   {fast:6.1f} FPS  ({fast / base:.2f}x)")
+    print("Motion gate vs full inference:", gate_agreement(frames))
@@ -0,0 +1,62 @@
+# models/quantize.py
+# Int8 CPU backend for the transformer sentiment models. Every nn.Linear is replaced
+# with a dynamically quantized one (int8 weights, activations quantized on the fly).
+# The converted weights are cached on disk, so later starts build the architecture from
+# its config and load the int8 state dict without touching the fp32 checkpoint.
+import os
+import re
+
+from models.registry import ROOT
+
+CACHE_DIR = os.environ.get("COACH_MODEL_CACHE", os.path.join(ROOT, ".model_cache"))
+
+
+def set_threads(threads=None):
+    """Intra-op threads for torch CPU inference (COACH_TORCH_THREADS by default; unset = torch's choice)."""
+    import torch
+    threads = threads or int(os.environ.get("COACH_TORCH_THREADS", 0) or 0)
+    if threads > 0:
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+
+def cache_path(model_name):
+    import torch
+    slug = re.sub(r"[^\w.-]+", "__", model_name)
+    return os.path.join(CACHE_DIR, f"{slug}.int8.torch-{torch.__version__.split('+')[0]}.pt")
+
+
+def _quantize(model):
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_int8(model_name):
+    """Int8 AutoModelForSequenceClassification for `model_name`, from the disk cache when possible."""
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    path = cache_path(model_name)
+    if os.path.exists(path):
+        try:
+            model = _quantize(AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(model_name)))
+            model.load_state_dict(torch.load(path, weights_only=True))
+            return model.eval()
+        except Exception as e:
+            # stale or partial cache (e.g. written by another torch build): rebuild it below
+            print(f"⚠️ Ignoring int8 cache {path}: {e}")
+
+    model = _quantize(AutoModelForSequenceClassification.from_pretrained(model_name).eval())
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(model.state_dict(), tmp)
+    os.replace(tmp, path)
+    print(f"💾 Cached int8 {model_name} at {path} ({os.path.getsize(path) / 2**20:.0f} MB)")
+    return model
+
+
+def int8_pipeline(model_name):
+    """sentiment-analysis pipeline on the int8 model (CPU only)."""
+    from transformers import AutoTokenizer, pipeline
+    return pipeline("sentiment-analysis", model=load_int8(model_name),
+                    tokenizer=AutoTokenizer.from_pretrained(model_name), device=-1)
@@ -0,0 +1,160 @@
+# models/registry.py
+# Process-wide model registry: every heavyweight model is registered with a loader and
+# created at most once, on first use (get) or from a background warm-up thread (preload).
+# Load time and the change in resident memory are recorded per model.
+# Models are shared by every session in the process; the ones that are not safe to call
+# from several threads at once (transformer pipelines, MediaPipe graphs) are used under lock(name).
+import os
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOSK_MODEL_PATH = os.path.join(ROOT, "vosk-model-small-en-us-0.15")
+LIVE_SENTIMENT_MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
+REPORT_SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+SENTIMENT_BACKEND = os.environ.get("COACH_SENTIMENT_BACKEND", "fp32")
+
+_loaders = {}
+_models = {}
+_stats = {}
+_load_locks = {}
+_use_locks = {}
+_lock = threading.Lock()
+
+# ---------------------- Memory ----------------------
+
+def rss_bytes():
+    """Current resident set size in bytes, or None if it can't be read on this platform."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+# ---------------------- Registry ----------------------
+
+def register(name, loader):
+    """Register `loader()` as the factory for model `name` (does not load it)."""
+    with _lock:
+        _loaders[name] = loader
+        _load_locks.setdefault(name, threading.Lock())
+
+
+def get(name):
+    """Return model `name`, loading it on first use. Concurrent callers share one load."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        if name not in _loaders:
+            raise KeyError(f"Unknown model: {name}")
+        load_lock = _load_locks[name]
+    with load_lock:
+        if name not in _models:
+            rss_before = rss_bytes()
+            t0 = time.perf_counter()
+            model = _loaders[name]()
+            seconds = time.perf_counter() - t0
+            rss_after = rss_bytes()
+            _stats[name] = {
+                "load_seconds": round(seconds, 3),
+                "rss_delta_mb": (round((rss_after - rss_before) / 2**20, 1)
+                                 if rss_before is not None and rss_after is not None else None),
+            }
+            _models[name] = model
+            print(f"✅ Loaded {name} in {seconds:.2f}s")
+    return _models[name]
+
+
+def lock(name):
+    """Re-entrant lock serialising calls into shared model `name`."""
+    with _lock:
+        return _use_locks.setdefault(name, threading.RLock())
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def preload(names=None, background=True):
+    """Warm up models (all registered ones by default), on a daemon thread unless `background` is False."""
+    names = list(names or _loaders)
+
+    def _warm():
+        for name in names:
+            try:
+                get(name)
+            except Exception as e:
+                print(f"⚠️ Could not preload {name}: {e}")
+        print("📦 Model registry:", stats())
+
+    if not background:
+        _warm()
+        return None
+    t = threading.Thread(target=_warm, name="model-preload", daemon=True)
+    t.start()
+    return t
+
+
+def stats():
+    """Per-model load time and RSS delta, plus the current process RSS."""
+    rss = rss_bytes()
+    return {
+        "models": {name: dict(s) for name, s in _stats.items()},
+        "rss_mb": round(rss / 2**20, 1) if rss is not None else None,
+    }
+
+# ---------------------- Built-in Models ----------------------
+
+def _load_vosk():
+    from vosk import Model
+    if not os.path.exists(VOSK_MODEL_PATH):
+        raise FileNotFoundError(f"Vosk model not found at {VOSK_MODEL_PATH}")
+    return Model(VOSK_MODEL_PATH)
+
+
+def build_pipeline(model_name, backend=None):
+    """
+    sentiment-analysis pipeline for `model_name`. backend "fp32" (default) or "int8"
+    (dynamic quantization, CPU only, see models/quantize.py); COACH_SENTIMENT_BACKEND
+    picks it when not given. COACH_TORCH_THREADS sets the intra-op thread count.
+    """
+    import torch
+    from transformers import pipeline
+    from models import quantize
+    quantize.set_threads()
+    backend = backend or SENTIMENT_BACKEND
+    if torch.cuda.is_available():
+        return pipeline("sentiment-analysis", model=model_name, device=0)
+    if backend == "int8":
+        return quantize.int8_pipeline(model_name)
+    if backend != "fp32":
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+    return pipeline("sentiment-analysis", model=model_name, device=-1)
+
+
+def _load_pipeline(model_name):
+    return lambda: build_pipeline(model_name)
+
+
+def _load_pose():
+    from models.posture_model import create_pose
+    return create_pose()
+
+
+def _load_face_mesh():
+    from models.posture_model import create_face_mesh
+    return create_face_mesh()
+
+
+# Registration order is the preload order: what the live view needs first comes first.
+register("vosk", _load_vosk)
+register("pose", _load_pose)
+register("face_mesh", _load_face_mesh)
+register("live_sentiment", _load_pipeline(LIVE_SENTIMENT_MODEL))
+register("sentiment", _load_pipeline(REPORT_SENTIMENT_MODEL))
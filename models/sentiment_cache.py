@@ -0,0 +1,85 @@
+# models/sentiment_cache.py
+import re
+import threading
+from collections import OrderedDict
+
+_WORD = re.compile(r"[\w']+")
+
+
+def normalize(text):
+    """Lowercase and collapse punctuation/whitespace so trivially different strings share a key."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+class SentimentCache:
+    """
+    Bounded LRU cache for sentiment results, keyed on (namespace, normalized text).
+
+    `token_delta` enables the prefix policy for streaming partials: if the new text is a
+    cached text plus fewer than `token_delta` extra words, the cached result is reused
+    instead of running inference again. 0 or 1 means exact matches only.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def get(self, namespace, text, token_delta=0):
+        """Return the cached value (exact or within `token_delta` words of a prefix) or None."""
+        key = normalize(text)
+        with self._lock:
+            if (namespace, key) in self._data:
+                self._data.move_to_end((namespace, key))
+                self.hits += 1
+                return self._data[(namespace, key)]
+            if token_delta > 1:
+                words = key.split(" ")
+                for drop in range(1, min(token_delta, len(words))):
+                    prefix = (namespace, " ".join(words[:-drop]))
+                    if prefix in self._data:
+                        self._data.move_to_end(prefix)
+                        self.near_hits += 1
+                        return self._data[prefix]
+            self.misses += 1
+            return None
+
+    def put(self, namespace, text, value):
+        key = (namespace, normalize(text))
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def cached(self, namespace, text, compute, token_delta=0):
+        """Look `text` up, computing and storing `compute(text)` on a miss."""
+        value = self.get(namespace, text, token_delta)
+        if value is None:
+            value = compute(text)
+            self.put(namespace, text, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.near_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Shared by the live subtitle path (app.py) and the report path (sentiment_model.py);
+# namespaces keep the two models' results apart.
+sentiment_cache = SentimentCache()
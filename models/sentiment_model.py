@@ -1,13 +1,120 @@
-from transformers import pipeline
+import time
 
-analyzer = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest")
+from models import registry, perf
+from models.sentiment_cache import sentiment_cache
 
-def analyze_sentiment(text):
+# Hard ceiling for encoder input; some tokenizers report a huge model_max_length
+MAX_TOKENS = 512
+
+# ---------------------- Live Subtitles ----------------------
+
+# Partials grow a word at a time; reuse a cached colour until the text has grown by this many words
+LIVE_TOKEN_DELTA = 3
+
+
+def _label_color(label):
+    if "1" in label or "2" in label:
+        return (255, 80, 80)     # red
+    elif "4" in label or "5" in label:
+        return (80, 255, 80)     # green
+    else:
+        return (255, 255, 255)   # white
+
+
+def analyze_sentiment_live(text):
+    """Color sentiment: red = neg, green = pos, white = neutral"""
+    if not text.strip():
+        return (255, 255, 255)
+    try:
+        return sentiment_cache.cached("live", text, _score_live, LIVE_TOKEN_DELTA)
+    except Exception:
+        return (255, 255, 255)
+
+
+def _score_live(text):
+    with registry.lock("live_sentiment"):
+        return _label_color(registry.get("live_sentiment")(text, truncation=True)[0]["label"])
+
+
+def analyze_sentiment_live_batch(texts):
+    """Batched analyze_sentiment_live: one pipeline call for several subtitles."""
+    colors = [(255, 255, 255)] * len(texts)
+    todo = []
+    for i, t in enumerate(texts):
+        if t.strip():
+            cached = sentiment_cache.get("live", t, LIVE_TOKEN_DELTA)
+            if cached is None:
+                todo.append(i)
+            else:
+                colors[i] = cached
+    if todo:
+        with registry.lock("live_sentiment"), perf.span("sentiment.live"):
+            results = registry.get("live_sentiment")([texts[i] for i in todo], truncation=True)
+        for i, result in zip(todo, results):
+            colors[i] = _label_color(result["label"])
+            sentiment_cache.put("live", texts[i], colors[i])
+    return colors
+
+# ---------------------- Report ----------------------
+
+def analyze_sentiment(text, overlap=64, batch_size=8):
+    """
+    Score the whole transcript: it is split into overlapping token windows that fit the
+    model, scored in batches, and the label probabilities are averaged weighted by window
+    length. Returns {"label", "score", "windows", "windows_per_sec"}.
+    Results are cached per (text, overlap); batch_size only changes throughput.
+    """
     text = text.strip()
     if not text:
         return {"label": "NEUTRAL", "score": 0.5}
-    result = analyzer(text[:512])[0]
+    return sentiment_cache.cached(f"report:{overlap}", text,
+                                  lambda t: _score_windows(t, overlap, batch_size))
+
+def token_windows(tokenizer, text, overlap=64):
+    """Split `text` into (start, end, window_text) token windows that fit the model with special tokens."""
+    limit = min(tokenizer.model_max_length, MAX_TOKENS)
+    size = limit - tokenizer.num_special_tokens_to_add(pair=False)
+    ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+    if len(ids) <= size:
+        return [(0, len(ids), text)]
+    step = max(1, size - overlap)
+    windows = []
+    for start in range(0, len(ids), step):
+        end = min(start + size, len(ids))
+        windows.append((start, end, tokenizer.decode(ids[start:end])))
+        if end == len(ids):
+            break
+    return windows
+
+def _score_windows(text, overlap, batch_size):
+    analyzer = registry.get("sentiment")
+    with registry.lock("sentiment"):  # fast tokenizers can't be shared across threads
+        windows = token_windows(analyzer.tokenizer, text, overlap)
+    limit = min(analyzer.tokenizer.model_max_length, MAX_TOKENS)
+
+    t0 = time.perf_counter()
+    with registry.lock("sentiment"), perf.span("sentiment.report"):
+        results = analyzer([w[2] for w in windows], batch_size=batch_size, top_k=None,
+                           truncation=True, max_length=limit)
+    elapsed = time.perf_counter() - t0
+
+    totals, weight_sum, series = {}, 0, []
+    for (start, end, _), scores in zip(windows, results):
+        weight = end - start or 1
+        weight_sum += weight
+        for s in scores:
+            totals[s["label"]] = totals.get(s["label"], 0.0) + s["score"] * weight
+        best = max(scores, key=lambda s: s["score"])
+        series.append({"start_token": start, "end_token": end,
+                       "label": best["label"].capitalize(), "score": round(best["score"], 2)})
+
+    label = max(totals, key=totals.get)
+    rate = len(windows) / elapsed if elapsed > 0 else None  # None, not inf: this dict is written as JSON
+    print(f"📈 Sentiment: {len(windows)} windows in {elapsed:.2f}s"
+          + (f" ({rate:.1f} windows/s)" if rate else ""))
     return {
-        "label": result["label"].capitalize(),
-        "score": round(result["score"], 2)
-    }
\ No newline at end of file
+        "label": label.capitalize(),
+        "score": round(totals[label] / weight_sum, 2),
+        "windows": series,
+        "windows_per_sec": round(rate, 2) if rate else None,
+    }
@@ -0,0 +1,137 @@
+# models/sentiment_worker.py
+import threading
+import time
+from collections import deque
+
+
+class SentimentWorker:
+    """
+    Background sentiment scorer for live subtitles.
+
+    - partial results are coalesced: only the latest pending partial is kept, and it is
+      scored once the burst settles (`debounce` s without a new partial) or after `max_delay` s
+    - final results are queued and scored together in micro-batches of up to `max_batch`
+    - `submit` never blocks, so the audio thread can hand off text and go straight back
+      to draining the microphone queue
+
+    `score_batch(texts) -> colors` does the inference; `on_result(text, color, final)`
+    is called from the worker thread for every scored text.
+    """
+
+    def __init__(self, score_batch, on_result, debounce=0.15, max_delay=0.6, max_batch=8, max_finals=32):
+        self.score_batch = score_batch
+        self.on_result = on_result
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.max_finals = max_finals
+
+        self._cond = threading.Condition()
+        self._partial = None
+        self._partial_since = 0.0
+        self._last_submit = 0.0
+        self._finals = deque()
+        self._running = False
+        self._thread = None
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    # ---------------------- Lifecycle ----------------------
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # ---------------------- Producer side ----------------------
+
+    def submit(self, text, final=False):
+        """Queue text for scoring. Superseded partials are dropped, never waited on."""
+        now = time.monotonic()
+        with self._cond:
+            self.submitted += 1
+            if final:
+                # a final result supersedes whatever partial was pending for the same utterance
+                if self._partial is not None:
+                    self._partial = None
+                    self.dropped += 1
+                if len(self._finals) >= self.max_finals:
+                    self._finals.popleft()
+                    self.dropped += 1
+                self._finals.append(text)
+            else:
+                if self._partial is None:
+                    self._partial_since = now
+                else:
+                    self.dropped += 1
+                self._partial = text
+            self._last_submit = now
+            self._cond.notify()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._finals) + (self._partial is not None)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._finals) + (self._partial is not None),
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "batches": self.batches,
+            }
+
+    # ---------------------- Worker side ----------------------
+
+    def _take(self):
+        """Block until there is work; return a list of (text, final) or None on stop."""
+        with self._cond:
+            while self._running:
+                if self._finals:
+                    batch = []
+                    while self._finals and len(batch) < self.max_batch:
+                        batch.append((self._finals.popleft(), True))
+                    return batch
+                if self._partial is not None:
+                    now = time.monotonic()
+                    wait = min(self.debounce - (now - self._last_submit),
+                               self.max_delay - (now - self._partial_since))
+                    if wait <= 0:
+                        text, self._partial = self._partial, None
+                        return [(text, False)]
+                    self._cond.wait(wait)
+                    continue
+                self._cond.wait()
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            texts = [text for text, _ in batch]
+            try:
+                colors = self.score_batch(texts)
+            except Exception as e:
+                print("Sentiment worker error:", e)
+                colors = [(255, 255, 255)] * len(texts)
+            with self._cond:
+                self.processed += len(texts)
+                self.batches += 1
+            for (text, final), color in zip(batch, colors):
+                self.on_result(text, color, final)
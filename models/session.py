@@ -0,0 +1,155 @@
+# models/session.py
+# One interview = one Session. A session owns everything that carries per-candidate state:
+# its Kaldi recogniser, its MediaPipe graphs (tracking state), its queues and metrics.
+# The heavyweight read-only models (Vosk Model, transformer pipelines) come from the
+# registry and are shared by every session in the process, so a worker process can host
+# several interviews at once.
+import json
+import queue
+import threading
+import time
+import uuid
+
+from vosk import KaldiRecognizer
+
+from models import registry, perf
+from models.metrics_store import SessionMetrics
+
+
+def put_drop_oldest(q, item):
+    """Non-blocking put on a bounded queue: evict the oldest item when full. Returns True if one was dropped."""
+    try:
+        q.put_nowait(item)
+        return False
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(item)
+        return True
+
+
+def compute_scores(metrics, sentiment):
+    posture_score = metrics["posture_score"]
+    eye_score = metrics["eye_score"]
+    speech_score = int(float(sentiment['score']) * 100)
+    overall = (posture_score + eye_score + speech_score) // 3
+
+    if overall > 85:
+        comment = "🌟 Excellent confidence and clarity!"
+    elif overall > 65:
+        comment = "💪 Good performance, just refine consistency."
+    else:
+        comment = "⚡ Needs improvement in posture and tone."
+    return {"posture": posture_score, "eye": eye_score, "speech": speech_score,
+            "overall": overall, "comment": comment}
+
+
+class Session:
+    """
+    Per-interview analyzers and buffers.
+
+    - audio: feed 16 kHz mono int16 PCM to accept_audio() (or let audio_callback fill
+      audio_q from a sounddevice RawInputStream); finish_audio() flushes the recogniser
+    - video: analyze_frame() runs this session's own Pose / FaceMesh graphs and records
+      the result in `metrics`; submit_frame() hands a frame to a consumer of infer_q
+    - report() scores the session once both streams are done
+    All methods are thread-safe; audio and video may be fed from different threads.
+    """
+
+    def __init__(self, session_id=None, sample_rate=16000, metrics_capacity=4 * 3600 * 30, motion_gate=True):
+        self.id = session_id or uuid.uuid4().hex[:12]
+        self.sample_rate = sample_rate
+        self.created = time.time()
+        self.audio_q = queue.Queue()
+        self.infer_q = queue.Queue(maxsize=1)
+        self.metrics = SessionMetrics(capacity=metrics_capacity)
+        self.segments = []            # finalised recogniser results
+        self.partial = ""
+        self._rec = KaldiRecognizer(registry.get("vosk"), sample_rate)
+        self._rec_lock = threading.Lock()
+        self._estimator = None        # built on first frame: MediaPipe graphs are not free
+        self._gate = None
+        self.motion_gate = motion_gate  # False: full inference on every frame (e.g. replay regression runs)
+        self._video_lock = threading.Lock()
+        self.closed = False
+
+    # ---------------------- Audio ----------------------
+
+    def audio_callback(self, indata, frames, time_info, status):
+        if status:
+            print(status)
+        self.audio_q.put(bytes(indata))
+
+    def accept_audio(self, data):
+        """Feed one PCM chunk. Returns (text, final): a finished segment or the current partial."""
+        perf.gauge("audio.queue_depth", self.audio_q.qsize())
+        with self._rec_lock:
+            with perf.span("asr.accept_waveform"):
+                accepted = self._rec.AcceptWaveform(bytes(data))
+            if accepted:
+                text = json.loads(self._rec.Result()).get("text", "")
+                if text:
+                    self.segments.append(text)
+                self.partial = ""
+                return text, True
+            self.partial = json.loads(self._rec.PartialResult()).get("partial", "")
+            return self.partial, False
+
+    def finish_audio(self):
+        """Flush the recogniser at the end of the stream; returns the last segment ('' if none)."""
+        with self._rec_lock:
+            final = json.loads(self._rec.FinalResult()).get("text", "")
+            if final:
+                self.segments.append(final)
+            self.partial = ""
+            return final
+
+    @property
+    def transcript(self):
+        return " ".join(self.segments)
+
+    # ---------------------- Video ----------------------
+
+    def submit_frame(self, frame):
+        """Offer a frame to whoever consumes infer_q; only the newest one is kept."""
+        return put_drop_oldest(self.infer_q, frame)
+
+    def analyze_frame(self, frame, t=None):
+        """Estimate posture / eye contact on a BGR frame and record it. Returns (posture, eye, info, marks)."""
+        with self._video_lock:
+            if self._estimator is None:
+                from models.posture_model import PostureEstimator, MotionGate
+                self._gate = MotionGate() if self.motion_gate else None
+                self._estimator = PostureEstimator(private=True, gate=self._gate)
+            result = self._estimator.estimate(frame)
+        posture, eye_contact, info, _ = result
+        self.metrics.append(time.monotonic() if t is None else t, posture, eye_contact, info)
+        return result
+
+    def posture_stats(self):
+        """Motion-gate counters: frames seen, inferences skipped, skip rate."""
+        with self._video_lock:
+            if self._gate is None:
+                return {"frames": 0, "skipped": 0, "skip_rate": 0.0}
+            return self._gate.stats()
+
+    # ---------------------- Report ----------------------
+
+    def report(self, transcript=None):
+        """Metrics summary, transcript sentiment and scores for the finished session."""
+        from models.sentiment_model import analyze_sentiment
+        transcript = self.transcript if transcript is None else transcript
+        metrics = self.metrics.summary()
+        sentiment = analyze_sentiment(transcript)
+        return {"id": self.id, "transcript": transcript, "metrics": metrics,
+                "sentiment": sentiment, "scores": compute_scores(metrics, sentiment)}
+
+    def close(self):
+        """Release this session's MediaPipe graphs (the shared models stay loaded)."""
+        with self._video_lock:
+            if self._estimator is not None:
+                self._estimator.close()
+                self._estimator = None
+        self.closed = True
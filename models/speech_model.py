@@ -1,89 +1,366 @@
-import sounddevice as sd
 import soundfile as sf
-import wave
 import json
 import numpy as np
 import queue
 import threading
 import scipy.signal
 import time
-from vosk import Model, KaldiRecognizer
+import os
+import struct
+import subprocess
+import tempfile
+from fractions import Fraction
+from concurrent.futures import ProcessPoolExecutor
+from vosk import KaldiRecognizer
 
-# Load Vosk model once globally
-model = Model(model_name="vosk-model-small-en-us-0.15")
+from models import registry, perf
 
-# Global flags / buffers
-q = queue.Queue()
-is_recording = False
-recording_thread = None
+# ---------------------- Recorder ----------------------
 
-# ---------------------- Audio Callback ----------------------
+class Recorder:
+    """Continuous mic-to-file capture. Each instance owns its queue, flag and thread."""
 
-def audio_callback(indata, frames, time_, status):
-    """Receive mic audio chunks and push to queue."""
-    if status:
-        print("Audio status:", status)
-    q.put(indata.copy())  # keep float32 copy
+    def __init__(self):
+        self.q = queue.Queue()
+        self.is_recording = False
+        self.thread = None
 
-# ---------------------- Start Recording ----------------------
+    def audio_callback(self, indata, frames, time_, status):
+        """Receive mic audio chunks and push to queue."""
+        if status:
+            print("Audio status:", status)
+        self.q.put(indata.copy())  # keep float32 copy
+
+    def start(self, filename="audio.wav", device=1):
+        """Start continuous audio capture in a background thread."""
+        self.is_recording = True
+        samplerate = 16000
+        print(f"🎙️ Continuous recording started on device {device}...")
+
+        def _record_worker():
+            import sounddevice as sd  # only needed for live capture; keeps file transcription headless
+            # open file once, write continuously
+            with sf.SoundFile(filename, mode='w', samplerate=samplerate,
+                              channels=1, subtype='PCM_16') as file:
+                with sd.InputStream(samplerate=samplerate, channels=1,
+                                    dtype='float32', callback=self.audio_callback,
+                                    device=device):
+                    while self.is_recording:
+                        try:
+                            data = self.q.get(timeout=0.5)
+                        except queue.Empty:
+                            continue
+                        data_int16 = np.int16(data * 32767)
+                        file.write(data_int16)
+            print("✅ Audio file closed cleanly.")
+
+        self.thread = threading.Thread(target=_record_worker, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the continuous recording and wait for the thread to finish."""
+        self.is_recording = False
+        time.sleep(0.5)  # short delay to let last chunk write
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        print("🛑 Recording stopped and saved.")
+
+
+# default recorder behind the module-level helpers
+_recorder = Recorder()
 
 def start_recording(filename="audio.wav", device=1):
     """Start continuous audio capture in a background thread."""
-    global is_recording, recording_thread
-    is_recording = True
-    samplerate = 16000
-    print(f"🎙️ Continuous recording started on device {device}...")
-
-    def _record_worker():
-        # open file once, write continuously
-        with sf.SoundFile(filename, mode='w', samplerate=samplerate,
-                          channels=1, subtype='PCM_16') as file:
-            with sd.InputStream(samplerate=samplerate, channels=1,
-                                dtype='float32', callback=audio_callback,
-                                device=device):
-                while is_recording:
-                    data = q.get()
-                    data_int16 = np.int16(data * 32767)
-                    file.write(data_int16)
-        print("✅ Audio file closed cleanly.")
-
-    recording_thread = threading.Thread(target=_record_worker, daemon=True)
-    recording_thread.start()
-
-# ---------------------- Stop Recording ----------------------
+    _recorder.start(filename, device)
 
 def stop_recording():
     """Stop the continuous recording and wait for the thread to finish."""
-    global is_recording, recording_thread
-    is_recording = False
-    time.sleep(0.5)  # short delay to let last chunk write
-    if recording_thread and recording_thread.is_alive():
-        recording_thread.join(timeout=2)
-    print("🛑 Recording stopped and saved.")
+    _recorder.stop()
+
+# ---------------------- Incremental WAV Writer ----------------------
+
+class WavWriter:
+    """
+    Append-only 16-bit PCM WAV writer. Audio goes to disk as it arrives and the RIFF/data
+    sizes in the header are patched every `sync_every` seconds of audio, so a crash loses
+    at most that much and the file always opens as a valid WAV.
+    """
+
+    HEADER_BYTES = 44  # PCM starts here, so the data can be memory-mapped as int16
+
+    def __init__(self, filename, rate=16000, channels=1, sync_every=1.0):
+        self.filename = filename
+        self.rate = rate
+        self.channels = channels
+        self._f = open(filename, "wb")
+        self._data_bytes = 0
+        self._synced = 0
+        self._sync_bytes = int(rate * channels * 2 * sync_every)
+        self._f.write(self._header(0))
+
+    def _header(self, data_bytes):
+        block = self.channels * 2
+        return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1,
+                           self.channels, self.rate, self.rate * block, block, 16, b"data", data_bytes)
+
+    def write(self, pcm):
+        self._f.write(pcm)
+        self._data_bytes += len(pcm)
+        if self._data_bytes - self._synced >= self._sync_bytes:
+            self.sync()
+
+    def sync(self):
+        """Rewrite the header sizes for everything written so far and flush to disk."""
+        self._f.seek(0)
+        self._f.write(self._header(self._data_bytes))
+        self._f.seek(0, os.SEEK_END)
+        self._f.flush()
+        self._synced = self._data_bytes
+
+    @property
+    def seconds(self):
+        return self._data_bytes / (self.rate * self.channels * 2)
+
+    def close(self):
+        if not self._f.closed:
+            self.sync()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ---------------------- Streaming Decode / Resample ----------------------
+
+class StreamingResampler:
+    """
+    Stateful polyphase FIR resampler: feed blocks of any size, get the same output as
+    resampling the whole signal at once, with memory bounded by the block size.
+    """
+
+    def __init__(self, rate_in, rate_out=16000, taps_per_phase=16):
+        ratio = Fraction(rate_out, rate_in)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        if self.up == self.down:
+            return
+        numtaps = taps_per_phase * self.up
+        h = scipy.signal.firwin(numtaps, 1.0 / max(self.up, self.down),
+                                window=("kaiser", 5.0)) * self.up
+        # phases[p, t] = h[p + t*up]: each output sample is one row dotted with recent input
+        self._phases = h.reshape(taps_per_phase, self.up).T.astype(np.float32)
+        self._taps = taps_per_phase
+        self._delay = (numtaps - 1) // 2          # filter group delay (upsampled samples)
+        self._buf = np.zeros(self._taps, dtype=np.float32)
+        self._buf_start = -self._taps             # global input index of _buf[0]
+        self._n_in = 0
+        self._n_out = 0
+
+    def _emit(self, n_end):
+        if n_end <= self._n_out:
+            return np.zeros(0, dtype=np.float32)
+        k = np.arange(self._n_out, n_end, dtype=np.int64) * self.down + self._delay
+        base = k // self.up
+        idx = base[:, None] - np.arange(self._taps)[None, :] - self._buf_start
+        out = np.einsum("ij,ij->i", self._buf[idx], self._phases[k % self.up])
+        self._n_out = n_end
+        # keep only the history the next output still needs
+        next_base = (n_end * self.down + self._delay) // self.up
+        drop = next_base - (self._taps - 1) - self._buf_start
+        if drop > 0:
+            self._buf = self._buf[drop:]
+            self._buf_start += drop
+        return out
+
+    def process(self, block):
+        """Resample one block of float mono samples."""
+        if self.up == self.down:
+            return np.asarray(block, dtype=np.float32)
+        self._buf = np.concatenate([self._buf, np.asarray(block, dtype=np.float32)])
+        self._n_in += len(block)
+        # output n is ready once input index (n*down + delay)//up has arrived
+        n_end = max(0, (self._n_in * self.up - 1 - self._delay) // self.down + 1)
+        return self._emit(n_end)
+
+    def flush(self):
+        """Drain the filter tail at end of stream."""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        pad = self._taps + self._delay // self.up + 1
+        self._buf = np.concatenate([self._buf, np.zeros(pad, dtype=np.float32)])
+        return self._emit(-(-self._n_in * self.up // self.down))
+
+
+def _to_pcm16(block):
+    return (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def stream_pcm16(filename, rate=16000, blocksize=8000, start=None, end=None):
+    """
+    Decode `filename` blockwise, downmix to mono and resample to `rate`,
+    yielding int16 PCM bytes. The file is never loaded whole or rewritten.
+    `start` / `end` (seconds) restrict decoding to a slice of the file.
+    """
+    with sf.SoundFile(filename) as f:
+        resampler = StreamingResampler(f.samplerate, rate)
+        first = int(start * f.samplerate) if start else 0
+        frames = int(end * f.samplerate) - first if end is not None else -1
+        if first:
+            f.seek(first)
+        for block in f.blocks(blocksize=blocksize, dtype="float32", always_2d=True, frames=frames):
+            out = resampler.process(block.mean(axis=1))
+            if len(out):
+                yield _to_pcm16(out)
+        tail = resampler.flush()
+        if len(tail):
+            yield _to_pcm16(tail)
+
+
+def ffmpeg_pcm16(path, rate=16000, blocksize=8000):
+    """
+    Decode the audio track of any media file (e.g. an uploaded .mp4) through an ffmpeg
+    pipe, yielding `rate` Hz mono int16 PCM bytes as ffmpeg produces them. Nothing is
+    written to disk; a file without an audio track yields nothing.
+    """
+    import imageio_ffmpeg  # bundled ffmpeg binary; only needed for media files
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-nostdin", "-loglevel", "error", "-i", path,
+           "-map", "0:a:0?", "-vn", "-ac", "1", "-ar", str(rate), "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"]
+    # stderr goes to a file, not a pipe: a corrupt upload can log more than a pipe buffer of
+    # decode errors, and ffmpeg would block on it while we block on stdout
+    errlog = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errlog)
+    try:
+        while True:
+            chunk = proc.stdout.read(blocksize * 2)
+            if not chunk:
+                break
+            yield chunk
+        proc.wait()
+        errlog.seek(0)
+        err = errlog.read().decode(errors="replace").strip()
+        if proc.returncode and "does not contain any stream" not in err:
+            raise RuntimeError(f"ffmpeg failed on {path}: {err[-2000:]}")
+    finally:
+        if proc.poll() is None:  # consumer stopped early
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        errlog.close()
+
+# ---------------------- Voice Activity Segmentation ----------------------
+
+def find_speech_segments(filename, frame_ms=30, min_silence=0.6, max_segment=30.0, margin_db=12.0):
+    """
+    Energy-based VAD: split the recording in the middle of silences longer than
+    `min_silence` seconds (forcing a cut at the quietest frame if a segment would exceed
+    `max_segment`). Returns [(start_sec, end_sec), ...] for segments that contain speech.
+    Only one energy value per frame is kept, so memory stays small for long files.
+    """
+    rate = 16000
+    hop = rate * frame_ms // 1000
+    energies = []
+    pending = np.zeros(0, dtype=np.int16)
+    for chunk in stream_pcm16(filename, rate):
+        pending = np.concatenate([pending, np.frombuffer(chunk, dtype=np.int16)])
+        n = len(pending) // hop
+        if n:
+            frames = pending[:n * hop].reshape(n, hop).astype(np.float32) / 32768.0
+            energies.extend(10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10))
+            pending = pending[n * hop:]
+    if not energies:
+        return []
+
+    energies = np.asarray(energies, dtype=np.float32)
+    # threshold relative to the noise floor, never below an absolute -50 dBFS
+    threshold = max(float(np.percentile(energies, 10)) + margin_db, -50.0)
+    speech = energies > threshold
+    min_sil = max(1, int(min_silence * 1000 / frame_ms))
+    max_len = max(min_sil * 2, int(max_segment * 1000 / frame_ms))
+
+    cuts = [0]
+    silence_start = None
+    for i, is_speech in enumerate(speech):
+        if not is_speech:
+            if silence_start is None:
+                silence_start = i
+        else:
+            if silence_start is not None and i - silence_start >= min_sil:
+                mid = (silence_start + i) // 2
+                if mid > cuts[-1]:
+                    cuts.append(mid)
+            silence_start = None
+        if i - cuts[-1] >= max_len:
+            lo = cuts[-1] + max_len // 2
+            cuts.append(lo + int(np.argmin(energies[lo:i + 1])))
+    cuts.append(len(speech))
+
+    sec = frame_ms / 1000
+    return [(round(a * sec, 3), round(b * sec, 3)) for a, b in zip(cuts, cuts[1:]) if speech[a:b].any()]
 
 # ---------------------- Transcription ----------------------
 
-def transcribe_audio(filename="audio.wav"):
-    """Transcribe recorded audio using Vosk with detailed debug output."""
-    import soundfile as sf, scipy.signal, wave, json
-    print("🔍 Opening file:", filename)
-    data, rate = sf.read(filename)
-    print(f"Audio shape: {data.shape}, Sample rate: {rate}")
+def _recognize(chunks, offset=0.0):
+    """Run one recogniser over PCM chunks. Returns (text, words) with word times shifted by `offset`."""
+    rec = KaldiRecognizer(registry.get("vosk"), 16000)
+    rec.SetWords(True)
+    texts, words = [], []
+
+    def _collect(res):
+        if res.get("text"):
+            texts.append(res["text"])
+        for w in res.get("result", []):
+            words.append({**w, "start": w["start"] + offset, "end": w["end"] + offset})
+
+    for chunk in chunks:
+        with perf.span("asr.accept_waveform"):
+            accepted = rec.AcceptWaveform(chunk)
+        if accepted:
+            _collect(json.loads(rec.Result()))
+    _collect(json.loads(rec.FinalResult()))
+    return " ".join(texts), words
+
+
+def _transcribe_segment(args):
+    """Process-pool worker (the registry loads the Vosk model once per worker process)."""
+    filename, start, end = args
+    text, words = _recognize(stream_pcm16(filename, start=start, end=end), offset=start)
+    return {"start": start, "end": end, "text": text, "words": words}
+
 
-    # Resample if not 16000 Hz
-    if rate != 16000:
-        print(f"Resampling {rate} → 16000 Hz")
-        data = scipy.signal.resample(data, int(len(data) * 16000 / rate))
-        sf.write(filename, data, 16000)
+def transcribe_segments(filename, workers=None, **vad_kwargs):
+    """
+    Split `filename` at silences and transcribe the segments on a process pool.
+    Returns [{start, end, text, words}, ...] in time order.
+    """
+    segments = find_speech_segments(filename, **vad_kwargs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    jobs = [(filename, a, b) for a, b in segments]
+    if workers <= 1 or len(jobs) <= 1:
+        return [_transcribe_segment(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=registry.get,
+                             initargs=("vosk",)) as pool:
+        return list(pool.map(_transcribe_segment, jobs))
 
-    wf = wave.open(filename, "rb")
-    rec = KaldiRecognizer(model, wf.getframerate())
+
+def transcribe_audio(filename="audio.wav", parallel=False, workers=None):
+    """
+    Transcribe an audio file with Vosk, streaming 16 kHz PCM straight into the recogniser.
+    With `parallel`, the file is VAD-segmented and transcribed across `workers` processes.
+    """
+    print("🔍 Opening file:", filename)
+    if parallel:
+        segments = transcribe_segments(filename, workers)
+        text = " ".join(s["text"] for s in segments if s["text"])
+        print(f"🧩 {len(segments)} segments transcribed in parallel")
+        print("🗣️ Transcribed text:", text)
+        return text
+
+    rec = KaldiRecognizer(registry.get("vosk"), 16000)
     text = ""
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
+    for chunk in stream_pcm16(filename):
+        if rec.AcceptWaveform(chunk):
             res = json.loads(rec.Result())
             print("Partial result:", res)
             text += res.get("text", "") + " "
@@ -93,6 +370,16 @@ def transcribe_audio(filename="audio.wav"):
     print("🗣️ Transcribed text:", text.strip())
     return text.strip()
 
+
+def transcribe_media(path):
+    """Transcribe the audio track of a video file, streamed from ffmpeg into the recogniser."""
+    print("🔍 Decoding audio from:", path)
+    t0 = time.perf_counter()
+    text, words = _recognize(ffmpeg_pcm16(path))
+    seconds = words[-1]["end"] if words else 0.0
+    print(f"🗣️ Transcribed {seconds:.1f}s of speech in {time.perf_counter() - t0:.2f}s:", text)
+    return text
+
 # ---------------------- Standalone Test ----------------------
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+# models/video_model.py
+import os
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+
+from models.posture_model import analyze_posture, MotionGate
+
+# Forward gaps shorter than this are walked with grab() (no pixel decode/convert);
+# longer gaps seek straight to the target frame.
+GRAB_LIMIT = 45
+
+# ---------------------- Probing & Sampling ----------------------
+
+def probe_video(path):
+    """Return (frame_count, fps, duration_sec) from the container header, without decoding."""
+    cap = cv2.VideoCapture(path)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+    return total, fps, (total / fps if fps else 0.0)
+
+
+def sample_frame_indexes(total_frames, samples):
+    """Evenly spaced frame indexes, one from the centre of each of `samples` equal bins."""
+    if total_frames <= 0 or samples <= 0:
+        return []
+    samples = min(samples, total_frames)
+    return sorted({int(total_frames * (i + 0.5) / samples) for i in range(samples)})
+
+
+def _read_at(cap, target, pos):
+    """Move `cap` from frame `pos` to frame `target` and decode it. Returns (frame, new_pos)."""
+    if target < pos or target - pos > GRAB_LIMIT:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+    else:
+        for _ in range(target - pos):
+            if not cap.grab():
+                return None, target
+    ret, frame = cap.read()
+    return (frame if ret else None), target + 1
+
+
+def grab_frame(path, index):
+    """Decode a single frame by seeking to it."""
+    cap = cv2.VideoCapture(path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    return frame if ret else None
+
+# ---------------------- Worker ----------------------
+
+def _analyze_indexes(path, indexes, fps, gate=True):
+    """
+    Process-pool worker: seek to each (sorted) index and run posture analysis. With `gate`,
+    a sample that barely differs from the last analysed one reuses its labels ("reused").
+    """
+    cap = cv2.VideoCapture(path)
+    motion = MotionGate(max_reuse=3) if gate else None
+    out = []
+    pos = 0
+    try:
+        for idx in indexes:
+            frame, pos = _read_at(cap, idx, pos)
+            if frame is None:
+                continue
+            if motion and not motion.check(frame) and out:
+                prev = out[-1]
+                out.append({**prev, "frame": idx, "t": idx / fps, "info": dict(prev["info"]), "reused": True})
+                continue
+            posture, eye_contact, _, info = analyze_posture(frame)
+            out.append({"frame": idx, "t": idx / fps, "posture": posture,
+                        "eye_contact": eye_contact, "info": info, "reused": False})
+    finally:
+        cap.release()
+    return out
+
+
+def _split(indexes, parts):
+    """Split sorted indexes into `parts` contiguous runs so each worker only seeks forward."""
+    size = -(-len(indexes) // parts)
+    return [indexes[i:i + size] for i in range(0, len(indexes), size)]
+
+
+def _run(path, indexes, fps, workers, gate=True):
+    if not indexes:
+        return []
+    if workers <= 1 or len(indexes) < 2:
+        return _analyze_indexes(path, indexes, fps, gate)
+    chunks = _split(indexes, min(workers, len(indexes)))
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [pool.submit(_analyze_indexes, path, chunk, fps, gate) for chunk in chunks]
+        results = []
+        for f in futures:
+            results.extend(f.result())
+    return results
+
+# ---------------------- Public API ----------------------
+
+def analyze_video_frames(path, samples=24, workers=None, adaptive=True, max_extra=24, gate=True):
+    """
+    Sample `samples` evenly spaced frames from the video and run analyze_posture on each,
+    spread over a process pool. With `adaptive`, a second pass adds the midpoint frame of
+    every interval where the posture or eye-contact label changed (up to `max_extra`).
+    With `gate`, samples that look unchanged from the previous one reuse its result.
+
+    Returns a timeline: list of {frame, t, posture, eye_contact, info, reused} sorted by time.
+    """
+    total, fps, _ = probe_video(path)
+    if workers is None:
+        workers = max(1, min(4, os.cpu_count() or 1))
+
+    timeline = _run(path, sample_frame_indexes(total, samples), fps, workers, gate)
+
+    if adaptive and len(timeline) > 1:
+        extra = []
+        for a, b in zip(timeline, timeline[1:]):
+            changed = (a["posture"], a["eye_contact"]) != (b["posture"], b["eye_contact"])
+            mid = (a["frame"] + b["frame"]) // 2
+            if changed and a["frame"] < mid < b["frame"]:
+                extra.append(mid)
+        extra = extra[:max_extra]
+        timeline += _run(path, extra, fps, workers, gate)
+        timeline.sort(key=lambda e: e["frame"])
+
+    return timeline
+
+
+def summarize_timeline(timeline):
+    """Collapse consecutive samples with identical labels into (start_t, end_t, posture, eye) runs."""
+    runs = []
+    for e in timeline:
+        if runs and runs[-1][2:] == (e["posture"], e["eye_contact"]):
+            runs[-1] = (runs[-1][0], e["t"], e["posture"], e["eye_contact"])
+        else:
+            runs.append((e["t"], e["t"], e["posture"], e["eye_contact"]))
+    return runs
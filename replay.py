@@ -0,0 +1,128 @@
+# replay.py
+# Re-analyse recorded sessions (captures, see models/capture.py) faster than real time.
+#
+#   python replay.py sessions/ --workers 4 --out replay.json
+#   python replay.py sessions/ --baseline replay.json --tolerance 2     # regression check
+#   python replay.py sessions/20261017-101500-ab12cd34ef56 --rescore   # update the archive
+#
+# Paths may be capture directories or folders containing them (e.g. the session archive).
+# Exits 1 if any replay failed, or (with --baseline) if any session's scores moved by more
+# than --tolerance points or a baseline session is missing from this run.
+import argparse
+import json
+import os
+import sys
+import time
+
+from models.capture import is_capture, replay_many
+
+SCORE_KEYS = ("posture", "eye", "speech", "overall")
+
+
+def find_captures(paths):
+    found = []
+    for path in paths:
+        if is_capture(path):
+            found.append(path)
+        elif os.path.isdir(path):
+            found += [os.path.join(path, d) for d in sorted(os.listdir(path)) if is_capture(os.path.join(path, d))]
+    return found
+
+
+def compare(results, baseline, tolerance):
+    """
+    [(session, score, old, new)] for scores that moved by more than `tolerance` points.
+    A baseline session that is missing from `results` or failed this time is reported
+    with score None (and new set to the error, if any).
+    """
+    old = {r["id"]: r for r in baseline if "scores" in r}
+    new = {r["id"]: r for r in results if "id" in r}
+    changed = []
+    for session in old:
+        r = new.get(session)
+        if r is None or "scores" not in r:
+            changed.append((session, None, None, r.get("error", "no scores") if r else "not replayed"))
+    for r in results:
+        base = old.get(r.get("id"))
+        if base is None or "scores" not in r:
+            continue
+        for key in SCORE_KEYS:
+            if abs(r["scores"][key] - base["scores"][key]) > tolerance:
+                changed.append((r["id"], key, base["scores"][key], r["scores"][key]))
+    return changed
+
+
+def rescore(path, result, frames):
+    """
+    Replace the session's archived analysis with the replayed one: meta.json, the index row,
+    transcript.json (the replay's recogniser segments) and metrics.npy (`frames`), so they
+    stay consistent with each other. The thumbnail and the recordings are left alone.
+    """
+    from models.archive import Archive
+    meta_path = os.path.join(path, "meta.json")
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    root = os.path.dirname(os.path.normpath(path))
+    Archive(root).save(meta.get("id", result["id"]), result["scores"], result["metrics"], result["sentiment"],
+                       segments=[s for s in result["segments"] if s], frames=frames,
+                       candidate=meta.get("candidate", ""), kind=meta.get("kind", "live"),
+                       started=meta.get("started"), path=path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded sessions through the analysis pipeline")
+    parser.add_argument("paths", nargs="+", help="capture directories or folders of them")
+    parser.add_argument("--workers", type=int, default=None, help="parallel replays (default: all cores)")
+    parser.add_argument("--gate", action="store_true", help="use the motion gate (default: full inference)")
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="allowed score change in points")
+    parser.add_argument("--rescore", action="store_true", help="store the new scores in the archive")
+    args = parser.parse_args(argv)
+
+    captures = find_captures(args.paths)
+    if not captures:
+        print("⚠️ No captures found (record with COACH_CAPTURE=1 python app.py)")
+        return 1
+    print(f"▶ Replaying {len(captures)} capture(s)")
+    t0 = time.perf_counter()
+    results = replay_many(captures, args.workers, args.gate)
+    wall = time.perf_counter() - t0
+    frames = [r.pop("frames", None) for r in results]  # numpy rows: archive only, not JSON
+
+    total, failed = 0.0, 0
+    for path, r, rows in zip(captures, results, frames):
+        if "error" in r:
+            print(f"  ❌ {os.path.basename(path)}: {r['error']}")
+            failed += 1
+            continue
+        info, s = r["replay"], r["scores"]
+        total += info["seconds"]
+        print(f"  {r['id']:<32} {info['speed_x']:6.1f}x realtime | posture {s['posture']:3d} | "
+              f"eye {s['eye']:3d} | speech {s['speech']:3d} | overall {s['overall']:3d}")
+        if args.rescore:
+            rescore(path, r, rows)
+    print(f"🏁 {len(captures)} session(s), {total:.0f}s of recordings in {wall:.1f}s "
+          f"({total / wall if wall else 0:.1f}x realtime overall)")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"💾 Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            changed = compare(results, json.load(f), args.tolerance)
+        for session, key, old, new in changed:
+            print(f"❌ {session}: {new}" if key is None else f"❌ {session}: {key} {old} -> {new}")
+        if changed:
+            return 1
+        if not failed:
+            print("✅ Scores unchanged")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
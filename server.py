@@ -0,0 +1,281 @@
+# server.py
+# Headless streaming server: one WebSocket connection = one interview Session.
+#
+#   python server.py --host 127.0.0.1 --port 8765 [--processes 4]
+#
+# Client -> server
+#   binary  b"A" + PCM              16 kHz mono int16 audio, any chunk size
+#   binary  b"V" + <f8 t> + JPEG    one camera frame; t (client clock, seconds) is echoed back
+#   text    {"type": "stop"}        end of interview: the report is sent, then the socket closes
+# The URL path names the candidate when --archive is on (ws://host:8765/<candidate>).
+# Server -> client (JSON text)
+#   ready, partial, final, sentiment, posture, report, error
+#
+# Backpressure: audio is never dropped. When a connection's audio queue is full the server
+# stops reading that socket, so TCP pushes back on the client. Frames are only the newest
+# one (older ones are dropped and counted), and outgoing partial / posture events are
+# dropped before finals and the report when a client reads too slowly.
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from models import registry, perf
+from models.archive import Archive
+from models.session import Session
+from models.sentiment_model import analyze_sentiment_live_batch
+from models.sentiment_worker import SentimentWorker
+
+FRAME_HEADER = struct.Struct("<d")
+
+# Events the client can afford to miss when its socket is backed up
+DROPPABLE = ("partial", "posture", "sentiment")
+
+
+class Limits:
+    """Per-server and per-connection limits."""
+
+    def __init__(self, max_sessions=32, max_seconds=3600, max_message=2**20,
+                 audio_queue=64, out_queue=256, max_fps=10.0):
+        self.max_sessions = max_sessions    # concurrent connections; more are refused (1013)
+        self.max_seconds = max_seconds      # wall-clock length of one interview
+        self.max_message = max_message      # bytes per WebSocket message
+        self.audio_queue = audio_queue      # audio chunks buffered per connection
+        self.out_queue = out_queue          # outgoing events buffered before partials are dropped
+        self.max_fps = max_fps              # frames analysed per second per connection
+
+
+class Connection:
+    """One client: its Session, the audio / video consumers and the outgoing event queue."""
+
+    def __init__(self, ws, loop, pool, limits, archive=None):
+        self.ws = ws
+        self.archive = archive
+        self.loop = loop
+        self.pool = pool
+        self.limits = limits
+        self.session = None
+        self.audio_q = asyncio.Queue(maxsize=limits.audio_queue)
+        self.out_q = asyncio.Queue()        # bounded for droppable events only, see emit()
+        self.frame = None                   # newest undecoded (t, jpeg)
+        self.last_jpeg = None               # archived as the session thumbnail
+        self.frame_ready = asyncio.Event()
+        self.audio_bytes = 0
+        self.stats = {"audio_chunks": 0, "frames": 0, "frames_analysed": 0,
+                      "frames_dropped": 0, "events_dropped": 0}
+        self.sentiment = SentimentWorker(analyze_sentiment_live_batch, self._on_sentiment)
+
+    def run_blocking(self, fn, *args):
+        return self.loop.run_in_executor(self.pool, fn, *args)
+
+    # ---------------------- Outgoing ----------------------
+
+    def emit(self, event):
+        """Queue an event for the client (event loop thread only). Finals and the report are always kept."""
+        if event["type"] in DROPPABLE and self.out_q.qsize() >= self.limits.out_queue:
+            self.stats["events_dropped"] += 1
+            return
+        self.out_q.put_nowait(event)
+
+    async def sender(self):
+        while True:
+            event = await self.out_q.get()
+            if event is None:
+                return
+            await self.ws.send(json.dumps(event))
+
+    def _on_sentiment(self, text, color, final):
+        # sentiment worker thread -> event loop
+        self.loop.call_soon_threadsafe(self.emit, {"type": "sentiment", "text": text,
+                                                   "color": list(color), "final": final})
+
+    # ---------------------- Consumers ----------------------
+
+    async def audio_consumer(self):
+        while True:
+            data = await self.audio_q.get()
+            if data is None:
+                await self.run_blocking(self.session.finish_audio)
+                return
+            text, final = await self.run_blocking(self.session.accept_audio, data)
+            self.audio_bytes += len(data)
+            if text:
+                self.emit({"type": "final" if final else "partial", "text": text,
+                           "audio_seconds": round(self.audio_bytes / 2 / self.session.sample_rate, 3)})
+                self.sentiment.submit(text, final=final)
+
+    async def video_consumer(self):
+        interval = 1.0 / self.limits.max_fps
+        while True:
+            await self.frame_ready.wait()
+            self.frame_ready.clear()
+            if self.frame is None:
+                return
+            t, jpeg = self.frame
+            self.frame = None
+            t0 = time.perf_counter()
+            result = await self.run_blocking(self._analyze_jpeg, jpeg)
+            if result is not None:
+                posture, eye_contact, info, _ = result
+                self.stats["frames_analysed"] += 1
+                self.emit({"type": "posture", "t": t, "posture": posture, "eye_contact": eye_contact,
+                           "info": {k: round(float(v), 3) for k, v in info.items()}})
+            # rate limit: frames arriving meanwhile collapse into the newest one
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - t0)))
+
+    def _analyze_jpeg(self, jpeg):
+        with perf.span("server.decode"):
+            frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        return self.session.analyze_frame(frame)
+
+    def _archive(self, report):
+        thumb = None
+        if self.last_jpeg is not None:
+            thumb = cv2.imdecode(np.frombuffer(self.last_jpeg, np.uint8), cv2.IMREAD_COLOR)
+        report["archive"] = self.archive.save(
+            self.session.id, report["scores"], report["metrics"], report["sentiment"],
+            segments=self.session.segments, frames=self.session.metrics.to_array(), thumbnail=thumb,
+            candidate=self.ws.request.path.strip("/"), kind="server", started=self.session.created)
+
+    def offer_frame(self, t, jpeg):
+        self.stats["frames"] += 1
+        if self.frame is not None:
+            self.stats["frames_dropped"] += 1
+        self.frame = (t, jpeg)
+        self.last_jpeg = jpeg
+        self.frame_ready.set()
+
+    # ---------------------- Lifecycle ----------------------
+
+    async def serve(self):
+        self.session = await self.run_blocking(Session)
+        sender = asyncio.create_task(self.sender())
+        try:
+            self.sentiment.start()
+            self.emit({"type": "ready", "session": self.session.id,
+                       "sample_rate": self.session.sample_rate, "max_fps": self.limits.max_fps})
+            await self.stream()
+            report = await self.run_blocking(self.session.report)
+            report["stats"] = dict(self.stats, sentiment=self.sentiment.stats(),
+                                   posture_gate=self.session.posture_stats())
+            if self.archive:
+                await self.run_blocking(self._archive, report)
+            self.emit({"type": "report", **report})
+            self.out_q.put_nowait(None)
+            await sender
+        finally:
+            sender.cancel()
+            self.session.close()
+
+    async def stream(self):
+        """Read the socket until stop / close / time limit, then let both consumers finish."""
+        audio = asyncio.create_task(self.audio_consumer())
+        video = asyncio.create_task(self.video_consumer())
+        try:
+            async with asyncio.timeout(self.limits.max_seconds):
+                await self.reader()
+        except TimeoutError:
+            self.emit({"type": "error", "reason": "session time limit reached"})
+        finally:
+            if not audio.done():
+                await self.audio_q.put(None)
+            self.frame = None
+            self.frame_ready.set()
+            await asyncio.gather(audio, video, return_exceptions=True)
+            await self.run_blocking(self.sentiment.stop)
+
+    async def reader(self):
+        async for message in self.ws:
+            if isinstance(message, str):
+                if json.loads(message).get("type") == "stop":
+                    return
+            elif message[:1] == b"A":
+                self.stats["audio_chunks"] += 1
+                await self.audio_q.put(message[1:])     # blocks when full -> stop reading
+            elif message[:1] == b"V" and len(message) > 1 + FRAME_HEADER.size:
+                (t,) = FRAME_HEADER.unpack_from(message, 1)
+                self.offer_frame(t, message[1 + FRAME_HEADER.size:])
+
+
+# ---------------------- Server ----------------------
+
+async def main(host, port, limits, workers=None, reuse_port=False, archive_dir=None):
+    loop = asyncio.get_running_loop()
+    archive = Archive(archive_dir) if archive_dir else None
+    pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count(), thread_name_prefix="analysis")
+    active = set()
+
+    async def handler(ws):
+        if len(active) >= limits.max_sessions:
+            await ws.close(1013, "server busy")
+            return
+        conn = Connection(ws, loop, pool, limits, archive)
+        active.add(conn)
+        perf.gauge("server.sessions", len(active))
+        try:
+            await conn.serve()
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            print("⚠️ Session failed:", e)
+            try:
+                await ws.send(json.dumps({"type": "error", "reason": str(e)}))
+            except ConnectionClosed:
+                pass
+        finally:
+            active.discard(conn)
+            perf.gauge("server.sessions", len(active))
+
+    try:
+        # load the shared models before accepting anyone
+        await loop.run_in_executor(pool, registry.preload, ["vosk", "live_sentiment", "sentiment"], False)
+        async with serve(handler, host, port, max_size=limits.max_message,
+                         max_queue=limits.audio_queue, reuse_port=reuse_port) as server:
+            print(f"🛰 Listening on ws://{host}:{port} (pid {os.getpid()}, max {limits.max_sessions} sessions)")
+            await server.serve_forever()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(host, port, limits, workers, reuse_port, archive_dir):
+    try:
+        asyncio.run(main(host, port, limits, workers, reuse_port, archive_dir))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless AI Interview Coach server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes sharing the port (SO_REUSEPORT, Linux)")
+    parser.add_argument("--threads", type=int, default=None, help="analysis threads per process")
+    parser.add_argument("--max-sessions", type=int, default=32, help="per process")
+    parser.add_argument("--max-seconds", type=float, default=3600)
+    parser.add_argument("--max-fps", type=float, default=10.0)
+    parser.add_argument("--archive", metavar="DIR", help="store finished sessions (candidate = URL path)")
+    args = parser.parse_args()
+
+    limits = Limits(max_sessions=args.max_sessions, max_seconds=args.max_seconds, max_fps=args.max_fps)
+    if args.processes == 1:
+        _run(args.host, args.port, limits, args.threads, False, args.archive)
+    else:
+        procs = [multiprocessing.Process(target=_run, args=(args.host, args.port, limits, args.threads,
+                                                            True, args.archive))
+                 for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()